@@ -0,0 +1,215 @@
+"""
+Serialized reservation writes.
+
+Checking for an overlapping reservation and then inserting is only safe if no
+other booking of the same space runs in between, so every write that claims
+a slot goes through book(): it takes a transaction-scoped advisory lock keyed
+by the space id (pg_advisory_xact_lock), re-checks for conflicts under the
+lock and only then creates the reservation. Bookings of different spaces never
+wait for each other, and a hot space queues its bookings instead of failing
+them. The time spent waiting for the lock is logged and returned so views can
+report it (Server-Timing).
+
+A space has `capacity` stalls; a booking fits if fewer reservations than that
+are in use at every instant of its window (peak_overlap).
+
+A PENDING reservation is a hold: it keeps its slot for RESERVATION_HOLD_TTL
+seconds while the driver pays. Lapsed holds stop counting as active at once
+(Reservation.objects.active()), and 'manage.py release_expired_holds' cancels
+them. Confirming a lapsed hold re-checks its slot under the lock.
+"""
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+from psycopg2 import errorcodes
+from apps.spaces.cards import refresh_cards
+from apps.spaces.models import SpaceProduct
+from .models import Reservation
+
+logger = logging.getLogger(__name__)
+
+# First key of the two-key advisory lock; the second is the space id
+LOCK_NAMESPACE = 0x5245
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 0.05
+SLOW_LOCK_WAIT = 0.2
+
+RETRYABLE_ERRORS = {
+    errorcodes.DEADLOCK_DETECTED,
+    errorcodes.SERIALIZATION_FAILURE,
+    errorcodes.LOCK_NOT_AVAILABLE,
+}
+
+
+class SlotUnavailable(Exception):
+    """Every stall of the space is taken at some point of the requested time."""
+
+
+def lock_spaces(space_ids):
+    """
+    Take the booking locks of the spaces, in id order so that callers locking
+    several spaces cannot deadlock. Must run inside a transaction; the locks
+    are released when it ends. Returns the seconds spent waiting.
+    """
+    started = time.monotonic()
+    with connection.cursor() as cursor:
+        for space_id in sorted(set(space_ids)):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [LOCK_NAMESPACE, space_id])
+    waited = time.monotonic() - started
+    if waited >= SLOW_LOCK_WAIT:
+        logger.warning('Waited %.0f ms for the booking lock of spaces %s', waited * 1000, sorted(set(space_ids)))
+    else:
+        logger.debug('Waited %.1f ms for the booking lock of spaces %s', waited * 1000, sorted(set(space_ids)))
+    return waited
+
+
+def peak_overlap(periods, start_at=None, end_at=None):
+    """
+    Most (start_at, end_at) periods in use at the same instant, optionally
+    within [start_at, end_at), by a sweep over their sorted bounds. Periods
+    are half-open: one ending as another starts does not overlap it.
+    """
+    events = []
+    for start, end in periods:
+        start = start if start_at is None else max(start, start_at)
+        end = end if end_at is None else min(end, end_at)
+        if start < end:
+            events.append((start, 1))
+            events.append((end, -1))
+    # At equal times, ends (-1) sort before starts
+    events.sort()
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def ensure_free(space_id, start_at, end_at, capacity=1, exclude_pk=None, confirmed_only=False):
+    """
+    Raise SlotUnavailable unless fewer than `capacity` active reservations of
+    the space (other than exclude_pk; only confirmed ones if confirmed_only)
+    are in use at every instant of [start_at, end_at).
+    """
+    reservations = Reservation.objects.filter(status=Reservation.Status.CONFIRMED) if confirmed_only else Reservation.objects.active()
+    overlapping = reservations.overlapping(start_at, end_at).filter(space_id=space_id)
+    if exclude_pk is not None:
+        overlapping = overlapping.exclude(pk=exclude_pk)
+    if capacity == 1:
+        taken = overlapping.exists()
+    else:
+        taken = peak_overlap(overlapping.values_list('start_at', 'end_at'), start_at, end_at) >= capacity
+    if taken:
+        raise SlotUnavailable()
+
+
+def _retryable(error):
+    return getattr(error.__cause__, 'pgcode', None) in RETRYABLE_ERRORS
+
+
+def run_locked(space_ids, func):
+    """
+    Call func() in a transaction holding the booking locks of the spaces.
+    Deadlocks and lock timeouts are retried up to MAX_ATTEMPTS times; an
+    integrity error (a constraint rejected the write) raises SlotUnavailable.
+    Returns (func()'s result, seconds spent waiting for the locks).
+    """
+    waited = 0.0
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                waited += lock_spaces(space_ids)
+                return func(), waited
+        except IntegrityError as e:
+            # The transaction (or savepoint) is rolled back, so callers can answer 409
+            logger.info('Booking of spaces %s rejected by a constraint: %s', space_ids, e)
+            raise SlotUnavailable() from e
+        except OperationalError as e:
+            if attempt == MAX_ATTEMPTS or not _retryable(e) or connection.in_atomic_block:
+                raise
+            logger.info('Retrying booking of spaces %s after %s', space_ids, e.__cause__.pgcode)
+            time.sleep(RETRY_DELAY * attempt)
+
+
+def book(space_id, start_at, end_at, create, capacity=1, exclude_pk=None):
+    """
+    Call create() to write a reservation of the space for [start_at, end_at)
+    once a stall is free for all of it (see ensure_free), holding the space's
+    booking lock. Raises SlotUnavailable on a conflict.
+
+    Returns (create()'s result, seconds spent waiting for the lock).
+    """
+    def locked():
+        ensure_free(space_id, start_at, end_at, capacity=capacity, exclude_pk=exclude_pk)
+        return create()
+
+    return run_locked([space_id], locked)
+
+
+def hold_expiry():
+    """When a hold taken now lapses."""
+    return timezone.now() + timedelta(seconds=settings.RESERVATION_HOLD_TTL)
+
+
+def _claim(reservation, **changes):
+    """Apply changes to a PENDING reservation under its lock, re-checking its slot."""
+    def locked():
+        current = Reservation.objects.select_for_update(of=('self',)).select_related('space').get(pk=reservation.pk)
+        if current.status != Reservation.Status.PENDING:
+            raise SlotUnavailable()
+        # A lapsed hold competes with every active reservation again. A live one
+        # already counts, but must still fit among the confirmed reservations,
+        # which overlapping holds taken before bookings were locked might not.
+        ensure_free(
+            current.space_id, current.start_at, current.end_at, capacity=current.space.capacity,
+            exclude_pk=current.pk, confirmed_only=not current.hold_lapsed,
+        )
+        for name, value in changes.items():
+            setattr(current, name, value)
+        current.save()
+        return current
+
+    return run_locked([reservation.space_id], locked)
+
+
+def renew_hold(reservation):
+    """
+    Extend the hold of a PENDING reservation by a full TTL, e.g. before
+    charging the driver. Raises SlotUnavailable if it lapsed and the slot was
+    taken since. Returns (reservation, lock wait).
+    """
+    return _claim(reservation, hold_expires_at=hold_expiry())
+
+
+def confirm(reservation):
+    """Turn a hold into a CONFIRMED reservation; raises SlotUnavailable like renew_hold()."""
+    return _claim(reservation, status=Reservation.Status.CONFIRMED, hold_expires_at=None)
+
+
+def release_expired_holds():
+    """Cancel PENDING reservations whose hold lapsed; returns how many."""
+    now = timezone.now()
+    with transaction.atomic():
+        space_ids = set(Reservation.objects.expired_holds(now).values_list('space_id', flat=True))
+        # Rows being confirmed are locked; the UPDATE waits and then skips them
+        released = Reservation.objects.expired_holds(now).update(status=Reservation.Status.CANCELED, updated_at=Now())
+        # update() sends no signals; lapsed holds already stopped counting, so this only tidies up cards
+        transaction.on_commit(lambda: refresh_cards(space_ids))
+    return released
+
+
+def quote_price(product, start_at, end_at):
+    """Total price of booking product for [start_at, end_at)."""
+    if product.type == SpaceProduct.ProductType.DAY_PASS:
+        return product.price
+    hours = (end_at - start_at).total_seconds() / 3600
+    return int(hours * product.price)
+
+
+def server_timing(waited):
+    """Server-Timing header value for a booking that waited `waited` seconds for its lock."""
+    return f'lock;dur={waited * 1000:.1f}'
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.reservations.booking import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Cancel pending reservations whose slot hold has lapsed. Run every minute or so.'
+
+    def handle(self, *args, **options):
+        released = release_expired_holds()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired holds.'))
@@ -0,0 +1,26 @@
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0006_payment'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "UPDATE reservations_reservation SET period = tstzrange(start_at, end_at, '[)') WHERE period IS NULL",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='period',
+            field=django.contrib.postgres.fields.ranges.DateTimeRangeField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=django.contrib.postgres.indexes.GistIndex(condition=models.Q(('status__in', ['PENDING', 'CONFIRMED'])), fields=['space', 'period'], name='reservation_active_period_gist'),
+        ),
+    ]
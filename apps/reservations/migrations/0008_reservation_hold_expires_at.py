@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0007_alter_vehicle_car_model"),
+        ("reservations", "0007_reservation_period_required"),
+        ("spaces", "0013_uploadsession"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="hold_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                condition=models.Q(
+                    ("hold_expires_at__isnull", False), ("status", "PENDING")
+                ),
+                fields=["hold_expires_at"],
+                name="reservation_hold_expiry_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0008_reservation_hold_expires_at"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="reservation",
+            name="exclude_overlapping_reservations",
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0007_alter_vehicle_car_model"),
+        ("reservations", "0009_remove_exclude_overlapping_reservations"),
+        ("spaces", "0014_space_capacity"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["driver", "created_at", "id"],
+                name="reservation_driver_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["space", "start_at"], name="reservation_space_start_idx"
+            ),
+        ),
+    ]
@@ -1,12 +1,31 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.postgres.fields import DateTimeRangeField
-from django.contrib.postgres.constraints import ExclusionConstraint
 from django.contrib.postgres.indexes import GistIndex
 from django.db.models import Q
+from django.db.models.functions import Now
+from django.utils import timezone
 from psycopg2.extras import DateTimeTZRange
 from apps.spaces.models import Space, SpaceProduct
 
+class ReservationQuerySet(models.QuerySet):
+    def active(self):
+        """Reservations that hold their slot: confirmed ones and pending ones whose hold has not lapsed."""
+        return self.filter(status__in=Reservation.ACTIVE_STATUSES).filter(
+            Q(hold_expires_at__isnull=True) | Q(hold_expires_at__gt=Now())
+        )
+
+    def expired_holds(self, now=None):
+        return self.filter(status=Reservation.Status.PENDING, hold_expires_at__lte=now or Now())
+
+    def overlapping(self, start_at, end_at):
+        """
+        Reservations whose [start_at, end_at) intersects the given window. Combined
+        with active() and a space this is answered by reservation_active_period_gist.
+        """
+        return self.filter(period__overlap=DateTimeTZRange(start_at, end_at, '[)'))
+
+
 class Reservation(models.Model):
     class Status(models.TextChoices):
         PENDING = 'PENDING', 'Pending'
@@ -14,6 +33,8 @@ class Reservation(models.Model):
         CANCELED = 'CANCELED', 'Canceled'
         COMPLETED = 'COMPLETED', 'Completed'
 
+    ACTIVE_STATUSES = [Status.PENDING, Status.CONFIRMED]
+
     space = models.ForeignKey(Space, on_delete=models.CASCADE, related_name='reservations')
     driver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reservations')
     vehicle = models.ForeignKey('accounts.Vehicle', on_delete=models.SET_NULL, null=True, blank=True, related_name='reservations')
@@ -23,19 +44,32 @@ class Reservation(models.Model):
     end_at = models.DateTimeField()
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     price_total = models.IntegerField()
-    period = DateTimeRangeField(null=True, blank=True) # Populated on save
+    # End of the lease a PENDING reservation has on its slot; None means no expiry
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
+    period = DateTimeRangeField(blank=True) # Populated on save; bulk writes must set it themselves
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReservationQuerySet.as_manager()
+
     class Meta:
-        constraints = [
-            ExclusionConstraint(
-                name='exclude_overlapping_reservations',
-                expressions=[
-                    ('space', '='),
-                    ('period', '&&'),
-                ],
-                condition=Q(status='CONFIRMED'),
+        # Overbooking is prevented by apps/reservations/booking.py under a per-space lock;
+        # a space with capacity > 1 legitimately has overlapping confirmed reservations.
+        indexes = [
+            # Driver's reservation list, newest first (keyset-paginated)
+            models.Index(fields=['driver', 'created_at', 'id'], name='reservation_driver_created_idx'),
+            # Per-space listings and date filters, e.g. a host's calendar
+            models.Index(fields=['space', 'start_at'], name='reservation_space_start_idx'),
+            # Conflict checks: active reservations of a space overlapping a window
+            GistIndex(
+                fields=['space', 'period'],
+                name='reservation_active_period_gist',
+                condition=Q(status__in=['PENDING', 'CONFIRMED']),
+            ),
+            models.Index(
+                fields=['hold_expires_at'],
+                name='reservation_hold_expiry_idx',
+                condition=Q(status='PENDING', hold_expires_at__isnull=False),
             ),
         ]
 
@@ -45,6 +79,10 @@ class Reservation(models.Model):
             self.period = DateTimeTZRange(self.start_at, self.end_at, '[)')
         super().save(*args, **kwargs)
 
+    @property
+    def hold_lapsed(self):
+        return self.hold_expires_at is not None and self.hold_expires_at <= timezone.now()
+
     def __str__(self):
         return f"Res {self.id} - {self.status}"
 
@@ -0,0 +1,126 @@
+"""
+Recurring reservations: one request books the same slot on many days.
+
+A pattern (the first occurrence plus weekdays and an end date or count) is
+expanded into occurrences at the same local wall-clock time. They are checked
+against the space's compiled availability in memory and against existing
+reservations with one query over the whole date span, under the space's
+booking lock, then inserted with one bulk_create. Occurrences that cannot be
+booked are reported with a reason; in all-or-nothing mode any conflict books
+nothing.
+"""
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from django.utils import timezone
+from psycopg2.extras import DateTimeTZRange
+from apps.spaces.availability import compiled_availability, is_covered
+from apps.spaces.cards import schedule_card_refresh
+from .booking import hold_expiry, peak_overlap, quote_price, run_locked
+from .models import Reservation
+
+MAX_OCCURRENCES = 90
+HORIZON_DAYS = 366
+
+CONFLICT_PAST = 'past'
+CONFLICT_UNAVAILABLE = 'unavailable'
+CONFLICT_BOOKED = 'booked'
+
+
+def expand(start_at, end_at, weekdays=None, until=None, count=None):
+    """
+    [(start_at, end_at)] of the occurrences of a weekly pattern, starting
+    with the given one, on `weekdays` (default: its own weekday) until the
+    local date `until` or `count` occurrences, at most MAX_OCCURRENCES.
+    """
+    current_tz = timezone.get_current_timezone()
+    first = timezone.localtime(start_at, current_tz)
+    # Naive wall-clock duration, so occurrences keep their local times across DST changes
+    duration = timezone.localtime(end_at, current_tz).replace(tzinfo=None) - first.replace(tzinfo=None)
+    weekdays = set(weekdays or [first.weekday()])
+    limit = min(count or MAX_OCCURRENCES, MAX_OCCURRENCES)
+    last_day = first.date() + timedelta(days=HORIZON_DAYS)
+    if until is not None:
+        last_day = min(last_day, until)
+
+    occurrences = []
+    day = first.date()
+    while len(occurrences) < limit and day <= last_day:
+        if day.weekday() in weekdays:
+            start = datetime.combine(day, first.time())
+            occurrences.append((timezone.make_aware(start, current_tz), timezone.make_aware(start + duration, current_tz)))
+        day += timedelta(days=1)
+    return occurrences
+
+
+class BookedPeriods:
+    """Capacity checks of new periods against a growing set of booked (start_at, end_at) periods."""
+
+    def __init__(self, periods, capacity=1):
+        self.periods = sorted(periods)
+        self.capacity = capacity
+
+    @classmethod
+    def load(cls, space, start_at, end_at):
+        """The active reservations of a space within a span, in one query."""
+        return cls(
+            Reservation.objects.active()
+            .filter(space=space, period__overlap=DateTimeTZRange(start_at, end_at, '[)'))
+            .values_list('start_at', 'end_at'),
+            capacity=space.capacity,
+        )
+
+    def fits(self, start_at, end_at):
+        # Only periods starting before end_at can overlap it
+        candidates = self.periods[:bisect_left(self.periods, (end_at,))]
+        return peak_overlap(candidates, start_at, end_at) < self.capacity
+
+    def add(self, start_at, end_at):
+        insort(self.periods, (start_at, end_at))
+
+
+def book_recurring(product, occurrences, all_or_nothing=False, **fields):
+    """
+    Book product's space for each (start_at, end_at) occurrence; fields
+    (driver, vehicle, car_number, status) are set on every reservation.
+
+    Returns (created reservations, [(start_at, end_at, reason)] conflicts,
+    lock wait). With all_or_nothing nothing is created if any occurrence
+    conflicts.
+    """
+    space = product.space
+    occurrences = sorted(occurrences)
+    if not occurrences:
+        return [], [], 0.0
+    now = timezone.now()
+    intervals = compiled_availability(space)
+    hold_expires_at = hold_expiry() if fields.get('status') == Reservation.Status.PENDING else None
+
+    def locked():
+        booked = BookedPeriods.load(space, occurrences[0][0], max(end for _, end in occurrences))
+        conflicts, reservations = [], []
+        for start_at, end_at in occurrences:
+            if start_at < now:
+                conflicts.append((start_at, end_at, CONFLICT_PAST))
+            elif not is_covered(intervals, start_at, end_at):
+                conflicts.append((start_at, end_at, CONFLICT_UNAVAILABLE))
+            elif not booked.fits(start_at, end_at):
+                conflicts.append((start_at, end_at, CONFLICT_BOOKED))
+            else:
+                booked.add(start_at, end_at)
+                reservations.append(Reservation(
+                    space=space, product=product, start_at=start_at, end_at=end_at,
+                    # bulk_create skips save(), which normally fills in period
+                    period=DateTimeTZRange(start_at, end_at, '[)'),
+                    price_total=quote_price(product, start_at, end_at),
+                    hold_expires_at=hold_expires_at, **fields,
+                ))
+        if conflicts and all_or_nothing:
+            return [], conflicts
+        created = Reservation.objects.bulk_create(reservations)
+        if created:
+            # bulk_create sends no post_save, so refresh the space's card here
+            schedule_card_refresh(space.pk)
+        return created, conflicts
+
+    (created, conflicts), waited = run_locked([space.pk], locked)
+    return created, conflicts, waited
@@ -1,8 +1,37 @@
 from rest_framework import serializers
 from django.utils import timezone
-from datetime import timedelta, datetime
+from datetime import timedelta
 from .models import Reservation
 from apps.spaces.models import SpaceProduct
+from apps.spaces.availability import compiled_availability, is_covered, day_window
+from .booking import SlotUnavailable, ensure_free, quote_price
+from .fleet import MAX_FLEET_SIZE
+from .recurring import expand, MAX_OCCURRENCES
+
+OVERLAP_MESSAGE = "이미 예약된 시간대입니다. 다른 시간을 선택해주세요."
+
+
+def booking_window(product_type, data):
+    """
+    (start_at, end_at) requested in data for a product type: the local day
+    of data['date'] for a DAY_PASS, else start_at/end_at on 30 minute steps.
+    Past windows are left to the caller.
+    """
+    if product_type == SpaceProduct.ProductType.DAY_PASS:
+        if not data.get('date'):
+            raise serializers.ValidationError("일일권은 날짜가 필수입니다.")
+        return day_window(data['date'])
+
+    start_at, end_at = data.get('start_at'), data.get('end_at')
+    if not start_at or not end_at:
+        raise serializers.ValidationError("시간제 예약은 시작/종료 시간이 필수입니다.")
+    if start_at >= end_at:
+        raise serializers.ValidationError("종료 시간은 시작 시간보다 뒤이어야 합니다.")
+    for dt in [start_at, end_at]:
+        if dt.minute % 30 != 0 or dt.second != 0 or dt.microsecond != 0:
+            raise serializers.ValidationError("예약은 30분 단위로만 가능합니다.")
+    return start_at, end_at
+
 
 class ReservationSerializer(serializers.ModelSerializer):
     product_id = serializers.PrimaryKeyRelatedField(
@@ -18,10 +47,12 @@ class ReservationSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = [
             'id', 'space', 'product_id', 'product', 'start_at', 'end_at', 
-            'date', 'status', 'price_total', 'created_at',
+            'date', 'status', 'price_total', 'hold_expires_at', 'created_at',
             'vehicle_id', 'carNumber', 'driver', 'vehicle'
         ]
-        read_only_fields = ['id', 'space', 'product', 'status', 'price_total', 'created_at', 'driver', 'vehicle']
+        read_only_fields = [
+            'id', 'space', 'product', 'status', 'price_total', 'hold_expires_at', 'created_at', 'driver', 'vehicle',
+        ]
         extra_kwargs = {
             'start_at': {'required': False},
             'end_at': {'required': False},
@@ -29,108 +60,36 @@ class ReservationSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         product = data.get('product')
-        start_at = data.get('start_at')
-        end_at = data.get('end_at')
-        date_input = data.get('date')
-
         now = timezone.now()
 
         # 1. Product Type Specific Validation
+        start_at, end_at = booking_window(product.type, data)
         if product.type == SpaceProduct.ProductType.DAY_PASS:
-            if not date_input:
-                raise serializers.ValidationError("일일권은 날짜가 필수입니다.")
-            
-            # Prevent past date
             # Check based on server timezone date
-            today = timezone.localdate(now)
-            if date_input < today:
+            if data['date'] < timezone.localdate(now):
                 raise serializers.ValidationError("과거 날짜는 예약할 수 없습니다.")
-
-            # Convert date to start/end times (00:00 - 00:00 next day)
-            # Assuming KST or server local time, simplistic approach using datetime.combine
-            # For robustness, we should use Django's timezone awareness.
-            dt_start = datetime.combine(date_input, datetime.min.time())
-            dt_end = dt_start + timedelta(days=1)
-            
-            # Make aware
-            if timezone.is_naive(dt_start):
-                 start_at = timezone.make_aware(dt_start)
-                 end_at = timezone.make_aware(dt_end)
-            else:
-                 start_at = dt_start
-                 end_at = dt_end
-            
-            # Assign back to data to be saved
-            data['start_at'] = start_at
-            data['end_at'] = end_at
-
-            # Price Calculation
-            data['price_total'] = product.price
-
-        elif product.type == SpaceProduct.ProductType.HOURLY:
-            if not start_at or not end_at:
-                raise serializers.ValidationError("시간제 예약은 시작/종료 시간이 필수입니다.")
-            
-            if start_at >= end_at:
-                raise serializers.ValidationError("종료 시간은 시작 시간보다 뒤이어야 합니다.")
-            
-            # Prevent past time
-            # Allow booking if start_at is in the future relative to request time
-            if start_at < now:
-                raise serializers.ValidationError("과거 시간은 예약할 수 없습니다.")
-
-            # 30-min increment validation
-            # Check minute is 0 or 30, second 0, microsecond 0
-            for dt in [start_at, end_at]:
-                if dt.minute % 30 != 0 or dt.second != 0 or dt.microsecond != 0:
-                     raise serializers.ValidationError("예약은 30분 단위로만 가능합니다.")
-
-            # Price Calculation
-            duration = end_at - start_at
-            hours = duration.total_seconds() / 3600  # Convert to hours
-            data['price_total'] = int(hours * product.price)
+        elif start_at < now:
+            raise serializers.ValidationError("과거 시간은 예약할 수 없습니다.")
+        data['start_at'] = start_at
+        data['end_at'] = end_at
+        data['price_total'] = quote_price(product, start_at, end_at)
 
         # 2. Availability Check
-        # Check if [start_at, end_at] is contained within ANY availability rule of the space
-        # Rule: day_of_week matches start_at's day, and times cover the range.
-        
-        # KEY FIX: Convert UTC start_at/end_at to Space's Local Time (Project Timezone) before comparing with naive Rule times.
-        current_tz = timezone.get_current_timezone()
-        start_local = start_at.astimezone(current_tz)
-        end_local = end_at.astimezone(current_tz)
-
+        # [start_at, end_at] must lie inside one continuous stretch of the space's compiled
+        # weekly availability (local time). Adjacent rules merge, so this also works across midnight.
         space = product.space
-        weekday = start_local.weekday() # 0=Mon (based on local time)
-        
-        # Convert datetime to time for comparison
-        req_start_time = start_local.time()
-        req_end_time = end_local.time()
-        
-        rules = space.availability_rules.filter(day_of_week=weekday)
-        is_covered = False
-        for rule in rules:
-            if rule.start_time <= req_start_time and rule.end_time >= req_end_time:
-                 is_covered = True
-                 break
-                 
-        if not is_covered:
+        if not is_covered(compiled_availability(space), start_at, end_at):
              raise serializers.ValidationError("Reservation time is not within space availability.")
 
         # 3. Overlap Check (Prevent Double Booking)
-        # Check against existing reservations for this space
-        overlapping_qs = Reservation.objects.filter(
-            space=space,
-            status__in=[Reservation.Status.PENDING, Reservation.Status.CONFIRMED],
-            start_at__lt=end_at,
-            end_at__gt=start_at
-        )
-        
-        # Exclude current instance if updating
-        if self.instance:
-            overlapping_qs = overlapping_qs.exclude(pk=self.instance.pk)
-            
-        if overlapping_qs.exists():
-             raise serializers.ValidationError("이미 예약된 시간대입니다. 다른 시간을 선택해주세요.")
+        # A free stall for the whole window; repeated under the space's lock when saving
+        try:
+            ensure_free(
+                space.pk, start_at, end_at, capacity=space.capacity,
+                exclude_pk=self.instance.pk if self.instance else None,
+            )
+        except SlotUnavailable:
+             raise serializers.ValidationError(OVERLAP_MESSAGE)
 
         # Set space explicitly
         data['space'] = space
@@ -142,9 +101,14 @@ class ReservationSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        # Expand space field
-        from apps.spaces.serializers import SpaceSerializer
-        representation['space'] = SpaceSerializer(instance.space).data
+        # Compact space summary; the full SpaceSerializer would query images, products and rules per row
+        representation['space'] = {
+            'id': instance.space.id,
+            'title': instance.space.title,
+            'address': instance.space.address,
+            'lat': str(instance.space.lat),
+            'lng': str(instance.space.lng),
+        }
         
         # Expand driver (minimal info)
         representation['driver'] = {
@@ -162,164 +126,98 @@ class ReservationSerializer(serializers.ModelSerializer):
             }
         
         return representation
-        start_at = data.get('start_at')
-        end_at = data.get('end_at')
-        date_input = data.get('date')
 
-        now = timezone.now()
 
-        # 1. Product Type Specific Validation
-        if product.type == SpaceProduct.ProductType.DAY_PASS:
-            if not date_input:
-                raise serializers.ValidationError("일일권은 날짜가 필수입니다.")
-            
-            # Prevent past date
-            # Check based on server timezone date
-            today = timezone.localdate(now)
-            if date_input < today:
-                raise serializers.ValidationError("과거 날짜는 예약할 수 없습니다.")
+class ReservationListQuerySerializer(serializers.Serializer):
+    """Filters of the reservation list: status=PENDING,CONFIRMED and a local date range on start_at."""
+    status = serializers.CharField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
 
-            # Convert date to start/end times (00:00 - 00:00 next day)
-            # Assuming KST or server local time, simplistic approach using datetime.combine
-            # For robustness, we should use Django's timezone awareness.
-            dt_start = datetime.combine(date_input, datetime.min.time())
-            dt_end = dt_start + timedelta(days=1)
-            
-            # Make aware
-            if timezone.is_naive(dt_start):
-                 start_at = timezone.make_aware(dt_start)
-                 end_at = timezone.make_aware(dt_end)
-            else:
-                 start_at = dt_start
-                 end_at = dt_end
-            
-            # Assign back to data to be saved
-            data['start_at'] = start_at
-            data['end_at'] = end_at
+    def validate_status(self, value):
+        statuses = [status.strip().upper() for status in value.split(',') if status.strip()]
+        unknown = set(statuses) - set(Reservation.Status.values)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown status: {', '.join(sorted(unknown))}.")
+        return statuses
 
-            # Price Calculation
-            data['price_total'] = product.price
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError("date_from must not be after date_to.")
+        return data
 
-        elif product.type == SpaceProduct.ProductType.HOURLY:
-            if not start_at or not end_at:
-                raise serializers.ValidationError("시간제 예약은 시작/종료 시간이 필수입니다.")
-            
-            if start_at >= end_at:
-                raise serializers.ValidationError("종료 시간은 시작 시간보다 뒤이어야 합니다.")
-            
-            # Prevent past time
-            # Allow booking if start_at is in the future relative to request time
-            if start_at < now:
-                raise serializers.ValidationError("과거 시간은 예약할 수 없습니다.")
 
-            # 30-min increment validation
-            # Check minute is 0 or 30, second 0, microsecond 0
-            for dt in [start_at, end_at]:
-                if dt.minute % 30 != 0 or dt.second != 0 or dt.microsecond != 0:
-                     raise serializers.ValidationError("예약은 30분 단위로만 가능합니다.")
+class RecurringReservationSerializer(serializers.Serializer):
+    """
+    A weekly pattern: the first occurrence (start_at/end_at, or date for a
+    DAY_PASS), the weekdays it repeats on (0=Monday, default its own) and an
+    end date (until) or number of occurrences (count).
+    """
+    product_id = serializers.PrimaryKeyRelatedField(
+        queryset=SpaceProduct.objects.filter(is_active=True).select_related('space'), source='product'
+    )
+    start_at = serializers.DateTimeField(required=False)
+    end_at = serializers.DateTimeField(required=False)
+    date = serializers.DateField(required=False)
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6), required=False, allow_empty=False
+    )
+    until = serializers.DateField(required=False)
+    count = serializers.IntegerField(required=False, min_value=1)
+    all_or_nothing = serializers.BooleanField(default=False)
+    vehicle_id = serializers.IntegerField(required=False)
+    carNumber = serializers.CharField(source='car_number', required=False)
 
-            # Price Calculation
-            duration = end_at - start_at
-            hours = duration.total_seconds() / 3600  # Convert to hours
-            data['price_total'] = int(hours * product.price)
+    def validate(self, data):
+        product = data['product']
+        if 'until' not in data and 'count' not in data:
+            raise serializers.ValidationError("Either until or count is required.")
+        if data.get('count', 0) > MAX_OCCURRENCES:
+            raise serializers.ValidationError({'count': f"At most {MAX_OCCURRENCES} occurrences."})
+
+        start_at, end_at = booking_window(product.type, data)
+        if end_at - start_at > timedelta(days=1):
+            raise serializers.ValidationError("Each occurrence can last at most one day.")
+
+        data['occurrences'] = expand(
+            start_at, end_at, weekdays=data.get('weekdays'), until=data.get('until'), count=data.get('count'),
+        )
+        if not data['occurrences']:
+            raise serializers.ValidationError("The pattern has no occurrences.")
+        return data
 
-        # 2. Availability Check
-        # Check if [start_at, end_at] is contained within ANY availability rule of the space
-        # Rule: day_of_week matches start_at's day, and times cover the range.
-        # This is a simplification: what if reservation spans midnight or multiple days (HOURLY)?
-        # For simplicity, we assume HOURLY reservation is within a single day or consecutive logic 
-        # aligns with a single rule if we don't support multi-day rule matching yet.
-        # But let's check `AvailabilityRule` logic.
-        
-        space = product.space
-        weekday = start_at.weekday() # 0=Mon
-        
-        # Simple containment check: Find a rule for this weekday that covers the time range
-        # Note: AvailabilityRule uses time objects. data['start_at'] is datetime.
-        # This check might fail for multi-day reservations using simple logic. 
-        # User constraint: "Reservation range is contained in availability_rules".
-        
-        # Convert datetime to time for comparison
-        req_start_time = start_at.time()
-        req_end_time = end_at.time()
-        
-        # Special handling for DAY_PASS or midnight wrapping:
-        # If end_at time is 00:00 and it's next day, rule might end at 23:59? 
-        # AvailabilityRule models time... 
-        # Let's assume Rule 09:00-18:00.
-        # If DAY_PASS, it asks for 00:00-24:00. This will FAIL if rule is only 09-18.
-        # WAIT. User requirement: "DAY_PASS is date -> 00:00~다음날00:00".
-        # But "Warning: 예약 구간은 availability_rules 안에 포함되어야 함".
-        # This implies DAY_PASS is only valid if rule covers 00:00-24:00 (24 hours)?
-        # OR DAY_PASS grants access for the whole day irrespective of availability?
-        # Usually DAY_PASS implies "All day access". 
-        # If Host set availability 9-5, can I buy Day Pass?
-        # User says: "예약 구간은 availability_rules 안에 포함되어야 함"
-        # STRICT INTERPRETATION: Yes, if rule is 9-5, you CANNOT buy Day Pass (0-24).
-        # This makes DAY_PASS usable only for 24h spaces.
-        # I will strictly follow "Included in availability_rules".
-        
-        rules = space.availability_rules.filter(day_of_week=weekday)
-        is_covered = False
-        for rule in rules:
-            # Rule: start <= req_start AND rule_end >= req_end
-            # Special case: Rule end 00:00 usually means 'until end of day' or 'next day'?
-            # Our time field can't store 24:00. Max 23:59:59.
-            # If logic requires 00:00 next day, model needs adjustment or convention.
-            # Usually end_time < start_time implies overnight?
-            # Let's assume simple intraday rules for now as per previous step.
-            
-            # Check logic:
-            if rule.start_time <= req_start_time:
-                 # Check end time.
-                 # If req_end_time is 00:00 (midnight of next day), effectively larger than any time?
-                 # If rule.end_time is 00:00 (meaning midnight? No time object 00:00 is Start of day).
-                 # Ideally AvailabilityRule should handle overnight. 
-                 # Let's stick to simple comparison.
-                 if rule.end_time >= req_end_time:
-                      is_covered = True
-                      break
-                 # Special case check: if req_end_time is 00:00 (next day start), it acts as max time?
-                 # But python time(0,0) is min time.
-                 # We need to handle `end_at` explicitly.
-                 
-        if not is_covered:
-             # Try to handle the "next day 00:00" case for DAY_PASS if Rule covers until "end of day".
-             # If rule.end_time is 23:59:59?
-             pass 
-             # STRICT CHECK: If not covered, Raise Error.
-             # I will assume standard comparison for now.
-             raise serializers.ValidationError("Reservation time is not within space availability.")
 
-        # 3. Overlap Check (Prevent Double Booking)
-        # Check against existing reservations for this space
-        # Status: PENDING or CONFIRMED
-        # Time overlapping: (StartA < EndB) and (EndA > StartB)
-        overlapping_qs = Reservation.objects.filter(
-            space=space,
-            status__in=[Reservation.Status.PENDING, Reservation.Status.CONFIRMED],
-            start_at__lt=end_at,
-            end_at__gt=start_at
-        )
-        
-        # Exclude current instance if updating
-        if self.instance:
-            overlapping_qs = overlapping_qs.exclude(pk=self.instance.pk)
-            
-        if overlapping_qs.exists():
-             raise serializers.ValidationError("이미 예약된 시간대입니다. 다른 시간을 선택해주세요.")
+class FleetReservationSerializer(serializers.Serializer):
+    """
+    One window (start_at/end_at, or date for day passes) booked on several
+    spaces at once, one product of the same type per space.
+    """
+    product_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=MAX_FLEET_SIZE)
+    start_at = serializers.DateTimeField(required=False)
+    end_at = serializers.DateTimeField(required=False)
+    date = serializers.DateField(required=False)
+    vehicle_id = serializers.IntegerField(required=False)
+    carNumber = serializers.CharField(source='car_number', required=False)
 
-        # Set space explicitly
-        data['space'] = space
-        
-        # Cleanup write-only fields not in model
-        data.pop('date', None)
-        
+    def validate(self, data):
+        product_ids = data['product_ids']
+        if len(set(product_ids)) != len(product_ids):
+            raise serializers.ValidationError({'product_ids': "Duplicate products."})
+        products = list(
+            SpaceProduct.objects.filter(pk__in=product_ids, is_active=True, space__is_active=True).select_related('space')
+        )
+        if len(products) != len(product_ids):
+            missing = sorted(set(product_ids) - {product.pk for product in products})
+            raise serializers.ValidationError({'product_ids': f"Unknown or inactive products: {missing}"})
+        if len({product.space_id for product in products}) != len(products):
+            raise serializers.ValidationError({'product_ids': "Only one product per space."})
+        if len({product.type for product in products}) != 1:
+            raise serializers.ValidationError({'product_ids': "All products must be of the same type."})
+
+        product_type = products[0].type
+        start_at, end_at = booking_window(product_type, data)
+        # As for single bookings: an hourly window must not have started, a day pass not ended
+        if (end_at if product_type == SpaceProduct.ProductType.DAY_PASS else start_at) < timezone.now():
+            raise serializers.ValidationError("과거 시간은 예약할 수 없습니다.")
+        data.update(products=products, start_at=start_at, end_at=end_at)
         return data
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        # Expand space field
-        from apps.spaces.serializers import SpaceSerializer
-        representation['space'] = SpaceSerializer(instance.space).data
-        return representation
@@ -0,0 +1,16 @@
+"""
+Propagates reservation writes to data derived from them in apps.spaces.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.spaces.cards import schedule_card_refresh
+from .models import Reservation
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def reservation_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # A space's next free slot depends on its active reservations
+    schedule_card_refresh(instance.space_id)
@@ -1,30 +1,69 @@
+from django.db import transaction
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
+from apps.spaces.availability import day_window
+from common.pagination import KeysetPagination
 from common.permissions import IsDriver
+from .booking import SlotUnavailable, book, confirm as confirm_hold, hold_expiry, renew_hold, server_timing
 from .models import Reservation
-from .serializers import ReservationSerializer
+from .fleet import FleetUnavailable, book_fleet
+from .recurring import book_recurring
+from .serializers import (
+    ReservationSerializer, RecurringReservationSerializer, FleetReservationSerializer,
+    ReservationListQuerySerializer, OVERLAP_MESSAGE,
+)
+
+
+def _summary(reservation):
+    """Compact representation of a reservation created in bulk."""
+    return {
+        'id': reservation.id, 'space': reservation.space_id, 'start_at': reservation.start_at,
+        'end_at': reservation.end_at, 'status': reservation.status, 'price_total': reservation.price_total,
+        'hold_expires_at': reservation.hold_expires_at,
+    }
+
 
 class ReservationViewSet(viewsets.ModelViewSet):
     serializer_class = ReservationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    pagination_class = KeysetPagination
+
     def get_queryset(self):
         # If 'host=true' param is present, return reservations for spaces owned by the user
         if self.request.query_params.get('host') == 'true':
-            # Assuming Space model has a 'host' field pointing to User
-            return Reservation.objects.filter(space__host=self.request.user).order_by('-created_at')
-        
-        # Default: Users see their own reservations as drivers
-        return Reservation.objects.filter(driver=self.request.user).order_by('-created_at')
+            queryset = Reservation.objects.filter(space__host=self.request.user)
+        else:
+            # Default: Users see their own reservations as drivers
+            queryset = Reservation.objects.filter(driver=self.request.user)
+        # Newest first, keyset-paginated; 'id' makes the order unique
+        return queryset.select_related('space', 'driver', 'vehicle').order_by('-created_at', '-id')
 
-    def perform_create(self, serializer):
-        if not self.request.user.is_driver:
-            raise permissions.PermissionDenied("Only drivers can make reservations.")
-        
-        # Handle Vehicle Logic
-        vehicle_id = serializer.validated_data.get('vehicle_id')
-        car_number = serializer.validated_data.get('car_number', '')
+    def filter_queryset(self, queryset):
+        if self.action != 'list':
+            return queryset
+        params = ReservationListQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        if filters.get('status'):
+            queryset = queryset.filter(status__in=filters['status'])
+        if filters.get('date_from'):
+            queryset = queryset.filter(start_at__gte=day_window(filters['date_from'])[0])
+        if filters.get('date_to'):
+            queryset = queryset.filter(start_at__lt=day_window(filters['date_to'])[1])
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response['Server-Timing'] = server_timing(self.lock_wait)
+        return response
+
+    def _vehicle(self, validated_data):
+        """(vehicle, car_number) of a booking request."""
+        vehicle_id = validated_data.get('vehicle_id')
+        car_number = validated_data.get('car_number', '')
         vehicle = None
 
         if vehicle_id:
@@ -35,12 +74,88 @@ class ReservationViewSet(viewsets.ModelViewSet):
                 car_number = vehicle.car_number
             except Vehicle.DoesNotExist:
                 pass 
+        return vehicle, car_number
+
+    def perform_create(self, serializer):
+        if not self.request.user.is_driver:
+            raise PermissionDenied("Only drivers can make reservations.")
+        
+        # Handle Vehicle Logic
+        vehicle, car_number = self._vehicle(serializer.validated_data)
         
         # Auto-Approval Logic
         space = serializer.validated_data.get('product').space
         initial_status = Reservation.Status.CONFIRMED if space.is_auto_approval else Reservation.Status.PENDING
+        # A pending reservation only holds its slot while the driver pays
+        hold_expires_at = hold_expiry() if initial_status == Reservation.Status.PENDING else None
         
-        serializer.save(driver=self.request.user, vehicle=vehicle, car_number=car_number, status=initial_status)
+        data = serializer.validated_data
+        # The serializer's overlap check ran unlocked; book() repeats it under the space's lock
+        def create():
+            return serializer.save(
+                driver=self.request.user, vehicle=vehicle, car_number=car_number, status=initial_status,
+                hold_expires_at=hold_expires_at,
+            )
+
+        try:
+            _, self.lock_wait = book(space.pk, data['start_at'], data['end_at'], create, capacity=space.capacity)
+        except SlotUnavailable:
+            raise ValidationError(OVERLAP_MESSAGE)
+
+    @action(detail=False, methods=['post'])
+    def recurring(self, request):
+        """Book a weekly pattern at once; see apps/reservations/recurring.py."""
+        if not request.user.is_driver:
+            raise PermissionDenied("Only drivers can make reservations.")
+        serializer = RecurringReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        product = data['product']
+        vehicle, car_number = self._vehicle(data)
+        initial_status = Reservation.Status.CONFIRMED if product.space.is_auto_approval else Reservation.Status.PENDING
+
+        try:
+            created, conflicts, waited = book_recurring(
+                product, data['occurrences'], all_or_nothing=data['all_or_nothing'],
+                driver=request.user, vehicle=vehicle, car_number=car_number, status=initial_status,
+            )
+        except SlotUnavailable:
+            return Response({'detail': OVERLAP_MESSAGE}, status=status.HTTP_409_CONFLICT)
+        body = {
+            'created': [_summary(reservation) for reservation in created],
+            'conflicts': [
+                {'start_at': start_at, 'end_at': end_at, 'reason': reason} for start_at, end_at, reason in conflicts
+            ],
+        }
+        response = Response(body, status=status.HTTP_201_CREATED if created else status.HTTP_409_CONFLICT)
+        response['Server-Timing'] = server_timing(waited)
+        return response
+
+    @action(detail=False, methods=['post'])
+    def fleet(self, request):
+        """Book one window on several spaces, all or nothing; see apps/reservations/fleet.py."""
+        if not request.user.is_driver:
+            raise PermissionDenied("Only drivers can make reservations.")
+        serializer = FleetReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        vehicle, car_number = self._vehicle(data)
+
+        try:
+            created, waited = book_fleet(
+                data['products'], data['start_at'], data['end_at'],
+                driver=request.user, vehicle=vehicle, car_number=car_number,
+            )
+        except FleetUnavailable as e:
+            return Response(
+                {'detail': 'Some spaces are not available.', 'conflicts': e.space_ids},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except SlotUnavailable:
+            return Response({'detail': 'Some spaces are not available.'}, status=status.HTTP_409_CONFLICT)
+        response = Response({'reservations': [_summary(r) for r in created]}, status=status.HTTP_201_CREATED)
+        response['Server-Timing'] = server_timing(waited)
+        return response
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -72,7 +187,6 @@ class ReservationViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
-        from django.db import IntegrityError
         reservation = self.get_object()
         
         # Only Host can manually confirm if it's PENDING
@@ -82,10 +196,9 @@ class ReservationViewSet(viewsets.ModelViewSet):
         if reservation.status != Reservation.Status.PENDING:
             return Response({'error': 'Only pending reservations can be confirmed.'}, status=status.HTTP_400_BAD_REQUEST)
             
-        reservation.status = Reservation.Status.CONFIRMED
         try:
-            reservation.save()
-        except IntegrityError:
+            confirm_hold(reservation)
+        except SlotUnavailable:
             return Response({'detail': 'This time slot is no longer available.'}, status=status.HTTP_409_CONFLICT)
             
         return Response({'status': 'confirmed'})
@@ -123,6 +236,12 @@ class ReservationViewSet(viewsets.ModelViewSet):
         if int(amount) != reservation.price_total:
              return Response({'error': 'Payment amount mismatch'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Keep the slot for the whole payment call; a lapsed hold is only renewed if the slot is still free
+        try:
+            reservation, _ = renew_hold(reservation)
+        except SlotUnavailable:
+            return Response({'detail': 'This time slot is no longer available.'}, status=status.HTTP_409_CONFLICT)
+
         # 2. Call NicePay API
         from .utils import NicePayClient
         from .models import Payment
@@ -133,16 +252,21 @@ class ReservationViewSet(viewsets.ModelViewSet):
         # 3. Handle Result
         if result.get('resultCode') == '0000':
             # Success
-            Payment.objects.create(
-                reservation=reservation,
-                tid=tid,
-                order_id=order_id,
-                amount=amount,
-                status=Payment.Status.PAID,
-                paid_at=result.get('authDate') # Requires parsing? NicePay returns string. Simplified for now.
-            )
-            reservation.status = Reservation.Status.CONFIRMED
-            reservation.save()
+            try:
+                with transaction.atomic():
+                    Payment.objects.create(
+                        reservation=reservation,
+                        tid=tid,
+                        order_id=order_id,
+                        amount=amount,
+                        status=Payment.Status.PAID,
+                        paid_at=result.get('authDate') # Requires parsing? NicePay returns string. Simplified for now.
+                    )
+                    confirm_hold(reservation)
+            except SlotUnavailable:
+                # The hold was lost (canceled or taken over) while charging; give the money back
+                client.cancel(tid, amount, reason='Reservation slot no longer available')
+                return Response({'detail': 'This time slot is no longer available.'}, status=status.HTTP_409_CONFLICT)
             return Response({'status': 'paid', 'data': result})
         else:
             # Failure
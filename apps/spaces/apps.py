@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class SpacesConfig(AppConfig):
+    name = 'apps.spaces'
+
+    def ready(self):
+        from . import signals  # noqa: F401
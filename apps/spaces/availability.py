@@ -0,0 +1,251 @@
+"""
+Weekly availability helpers.
+
+AvailabilityRule times are naive local times (project TIME_ZONE). A rule that
+ends at END_OF_DAY (23:59) or later is treated as open until midnight, which
+is how hosts express "all day" since TimeField cannot hold 24:00.
+
+A space's rules are compiled into merged minute-of-week intervals and stored
+on Space.availability_intervals, so coverage checks read the already loaded
+space row instead of querying and looping over rules. Adjacent rules merge,
+including across midnight and from Sunday into Monday.
+"""
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from .models import Space, AvailabilityRule
+
+END_OF_DAY = time(23, 59)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+
+def day_window(date):
+    """Aware [00:00, next day 00:00) local window of a date, as booked by a DAY_PASS."""
+    current_tz = timezone.get_current_timezone()
+    start_at = timezone.make_aware(datetime.combine(date, time.min), current_tz)
+    return start_at, timezone.make_aware(datetime.combine(date + timedelta(days=1), time.min), current_tz)
+
+
+def day_segments(start_at, end_at):
+    """
+    Split [start_at, end_at) into per local-day pieces.
+
+    Yields (weekday, start_time, end_time, reaches_midnight) where
+    reaches_midnight means the piece runs to the end of its day.
+    """
+    current_tz = timezone.get_current_timezone()
+    start_local = start_at.astimezone(current_tz)
+    end_local = end_at.astimezone(current_tz)
+
+    day = start_local.date()
+    while True:
+        next_midnight = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), current_tz)
+        seg_start = max(start_local, timezone.make_aware(datetime.combine(day, time.min), current_tz))
+        seg_end = min(end_local, next_midnight)
+        if seg_start < seg_end:
+            yield day.weekday(), seg_start.time(), seg_end.time(), seg_end == next_midnight
+        if end_local <= next_midnight:
+            break
+        day += timedelta(days=1)
+
+
+def covered_by_rules_q(start_at, end_at, space_ref='pk'):
+    """
+    Q over Space that is true when every day piece of the window is inside one
+    availability rule. One correlated EXISTS per local day, so a search stays
+    a single query.
+    """
+    condition = Q()
+    for weekday, seg_start, seg_end, reaches_midnight in day_segments(start_at, end_at):
+        rules = AvailabilityRule.objects.filter(
+            space=OuterRef(space_ref),
+            day_of_week=weekday,
+            start_time__lte=seg_start,
+            end_time__gte=END_OF_DAY if reaches_midnight else seg_end,
+        )
+        condition &= Q(Exists(rules))
+    return condition
+
+
+def _minute_of_day(value, is_end=False):
+    if is_end and value >= END_OF_DAY:
+        return MINUTES_PER_DAY
+    return value.hour * 60 + value.minute
+
+
+def compile_rules(rules):
+    """Merged, sorted [start, end) minute-of-week intervals covered by the rules."""
+    intervals = sorted(
+        (rule.day_of_week * MINUTES_PER_DAY + _minute_of_day(rule.start_time),
+         rule.day_of_week * MINUTES_PER_DAY + _minute_of_day(rule.end_time, is_end=True))
+        for rule in rules
+    )
+    merged = []
+    for start, end in intervals:
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def invalidate_availability(space_id):
+    """Drop the compiled rules of a space; they are recompiled on next use."""
+    # update() keeps updated_at and the save signals out of it: the catalog itself did not change
+    Space.objects.filter(pk=space_id).update(
+        availability_intervals=None,
+        availability_version=F('availability_version') + 1,
+    )
+
+
+def compiled_availability(space):
+    """The space's compiled rules, compiling and storing them if invalidated."""
+    if space.availability_intervals is None:
+        intervals = compile_rules(space.availability_rules.all())
+        # Only store if no rule was written since the space row was read,
+        # otherwise the rules we compiled may already be stale.
+        Space.objects.filter(pk=space.pk, availability_version=space.availability_version).update(
+            availability_intervals=intervals,
+        )
+        space.availability_intervals = intervals
+    return space.availability_intervals
+
+
+def _two_weeks(intervals):
+    """Intervals repeated over two weeks, merged across the week boundary."""
+    unrolled = [list(i) for i in intervals] + [[s + MINUTES_PER_WEEK, e + MINUTES_PER_WEEK] for s, e in intervals]
+    merged = []
+    for start, end in unrolled:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def is_covered(intervals, start_at, end_at):
+    """Whether [start_at, end_at) lies inside one continuous stretch of availability."""
+    current_tz = timezone.get_current_timezone()
+    start_local = start_at.astimezone(current_tz)
+    duration = (end_at - start_at).total_seconds() / 60
+    if duration <= 0:
+        return False
+    if duration > MINUTES_PER_WEEK:
+        return intervals == [[0, MINUTES_PER_WEEK]]
+
+    start = (
+        start_local.weekday() * MINUTES_PER_DAY + start_local.hour * 60 + start_local.minute
+        + (start_local.second + start_local.microsecond / 1e6) / 60
+    )
+    stretches = _two_weeks(intervals)
+    index = bisect_right([s for s, _ in stretches], start) - 1
+    return index >= 0 and stretches[index][1] >= start + duration
+
+
+def weekly_slot_masks(intervals):
+    """
+    {weekday: mask} of the slots fully inside the compiled intervals. Bit i is
+    the half hour starting at i * SLOT_MINUTES after local midnight.
+    """
+    masks = dict.fromkeys(range(7), 0)
+    for start, end in intervals:
+        first = -(-start // SLOT_MINUTES)  # ceil
+        last = end // SLOT_MINUTES
+        for slot in range(first, last):
+            day, index = divmod(slot, SLOTS_PER_DAY)
+            masks[day] |= 1 << index
+    return masks
+
+
+def slot_range_mask(start_minute, end_minute):
+    """Mask of the slots intersecting [start_minute, end_minute) of one day."""
+    first = max(0, start_minute // SLOT_MINUTES)
+    last = min(SLOTS_PER_DAY, -(-end_minute // SLOT_MINUTES))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def booked_slot_masks(periods, first_day, days, capacity=1):
+    """
+    {date: mask} of the slots touched by at least `capacity` of the
+    (start_at, end_at) periods, i.e. with no stall left.
+    """
+    current_tz = timezone.get_current_timezone()
+    origin = timezone.make_aware(datetime.combine(first_day, time.min), current_tz)
+    # layers[date][k] has the slots touched by more than k periods
+    layers = {first_day + timedelta(days=i): [0] * capacity for i in range(days)}
+    for start_at, end_at in periods:
+        start = int((start_at - origin).total_seconds() // 60)
+        end = int(-(-(end_at - origin).total_seconds() // 60))
+        for index in range(max(0, start // (24 * 60)), min(days, -(-end // (24 * 60)))):
+            day_start = index * 24 * 60
+            mask = slot_range_mask(start - day_start, end - day_start)
+            counts = layers[first_day + timedelta(days=index)]
+            for k in range(capacity - 1, 0, -1):
+                counts[k] |= counts[k - 1] & mask
+            counts[0] |= mask
+    return {date: counts[-1] for date, counts in layers.items()}
+
+
+def build_slot_calendar(intervals, periods, first_day, days, now, capacity=1):
+    """
+    Free and booked half-hour slots over [first_day, first_day + days) from
+    compiled intervals and active (start_at, end_at) periods; a slot is
+    booked once all `capacity` stalls are taken. Slots already started are
+    never free.
+    """
+    current_tz = timezone.get_current_timezone()
+    open_masks = weekly_slot_masks(intervals)
+    booked = booked_slot_masks(periods, first_day, days, capacity)
+
+    now_local = now.astimezone(current_tz)
+    calendar = []
+    for date, booked_mask in booked.items():
+        free_mask = open_masks[date.weekday()] & ~booked_mask
+        if date < now_local.date():
+            free_mask = 0
+        elif date == now_local.date():
+            started = -(-(now_local.hour * 60 + now_local.minute + (now_local.second > 0)) // SLOT_MINUTES)
+            free_mask &= FULL_DAY_MASK & ~((1 << started) - 1)
+        calendar.append({'date': date, 'free': free_mask, 'booked': booked_mask & FULL_DAY_MASK})
+    return calendar
+
+
+def first_free_slot(calendar):
+    """Start of the earliest free slot of a calendar, or None."""
+    current_tz = timezone.get_current_timezone()
+    for day in calendar:
+        if day['free']:
+            index = (day['free'] & -day['free']).bit_length() - 1  # lowest set bit
+            midnight = timezone.make_aware(datetime.combine(day['date'], time.min), current_tz)
+            return midnight + timedelta(minutes=index * SLOT_MINUTES)
+    return None
+
+
+def slot_calendar(space, first_day, days, now=None):
+    """
+    Slot calendar of a space (see build_slot_calendar). One query for the
+    active reservations in the range; rules come compiled.
+    """
+    from apps.reservations.models import Reservation
+
+    current_tz = timezone.get_current_timezone()
+    range_start = timezone.make_aware(datetime.combine(first_day, time.min), current_tz)
+    range_end = range_start + timedelta(days=days)
+    periods = (
+        Reservation.objects.active().overlapping(range_start, range_end)
+        .filter(space=space).values_list('start_at', 'end_at')
+    )
+    return build_slot_calendar(
+        compiled_availability(space), periods, first_day, days, now or timezone.now(), space.capacity,
+    )
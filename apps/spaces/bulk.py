@@ -0,0 +1,77 @@
+"""
+Set-based host operations over many spaces at once.
+
+Each operation is a few UPDATE statements over the selected ids inside one
+transaction, whatever the number of spaces. The space rows are locked first
+so a reservation being validated for one of them waits for the change.
+QuerySet.update() sends no save signals, so updated_at is bumped here (for
+delta sync and the suggestion index) and cards, tiles and clusters are
+refreshed once on commit.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+from .cards import refresh_cards
+from .clusters import refresh_clusters
+from .models import Space, SpaceProduct
+
+
+def _lock(space_ids):
+    """Lock the spaces; returns [(id, grid_x, grid_y)] of those that exist."""
+    return list(
+        Space.objects.filter(pk__in=space_ids).order_by('pk').select_for_update()
+        .values_list('pk', 'grid_x', 'grid_y')
+    )
+
+
+def _touch(rows):
+    space_ids = [pk for pk, _, _ in rows]
+    points = [(x, y) for _, x, y in rows]
+    Space.objects.filter(pk__in=space_ids).update(updated_at=Now())
+    transaction.on_commit(lambda: refresh_cards(space_ids))
+    transaction.on_commit(lambda: refresh_clusters(points))
+
+
+def set_active(space_ids, is_active):
+    """
+    Activate or deactivate spaces. Deactivation cancels their pending and
+    confirmed reservations. Returns (spaces changed, reservations canceled).
+    """
+    from apps.reservations.models import Reservation
+
+    canceled = 0
+    with transaction.atomic():
+        rows = _lock(space_ids)
+        changed_ids = set(
+            Space.objects.filter(pk__in=[pk for pk, _, _ in rows]).exclude(is_active=is_active)
+            .values_list('pk', flat=True)
+        )
+        if not changed_ids:
+            return 0, 0
+        Space.objects.filter(pk__in=changed_ids).update(is_active=is_active)
+        if not is_active:
+            canceled = (
+                Reservation.objects.active().filter(space_id__in=changed_ids)
+                .update(status=Reservation.Status.CANCELED, updated_at=Now())
+            )
+        _touch([row for row in rows if row[0] in changed_ids])
+    return len(changed_ids), canceled
+
+
+def reprice(space_ids, product_type, price=None, percent=None):
+    """
+    Set the active `product_type` products of the spaces to `price`, or change
+    them by `percent` (rounded down to whole won). Returns the products updated.
+    """
+    with transaction.atomic():
+        rows = _lock(space_ids)
+        products = SpaceProduct.objects.filter(
+            space_id__in=[pk for pk, _, _ in rows], type=product_type, is_active=True,
+        )
+        repriced = set(products.values_list('space_id', flat=True))
+        if price is not None:
+            updated = products.update(price=price)
+        else:
+            updated = products.update(price=F('price') * (100 + percent) / 100)
+        _touch([row for row in rows if row[0] in repriced])
+    return updated
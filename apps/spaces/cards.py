@@ -0,0 +1,124 @@
+"""
+SpaceCard read model.
+
+A card holds everything a list or map view shows for a space (cover image,
+prices, next free slot), so those views are one indexed query over
+spaces_spacecard instead of a space query plus images/products/rules
+fan-out. Cards are refreshed on commit of any write that affects them (see
+signals.py and apps.reservations.signals); next_free_at also ages with the
+clock, so run 'manage.py refresh_space_cards' periodically. Cards are also
+the source of the static map tiles (see tiles.py).
+"""
+from datetime import timedelta
+from django.db.models import OuterRef, Subquery
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from common.db import on_commit_once
+from .availability import build_slot_calendar, compile_rules, first_free_slot
+from .renditions import CARD_RENDITION
+from .tiles import rebuild_tiles, refresh_tiles, tile_of
+from .models import Space, SpaceCard, SpaceImage, SpaceProduct, AvailabilityRule
+
+# How far ahead next_free_at looks
+LOOKAHEAD_DAYS = 7
+BATCH_SIZE = 500
+
+
+def _product_price(product_type):
+    return Subquery(
+        SpaceProduct.objects.filter(space=OuterRef('pk'), type=product_type, is_active=True)
+        .order_by('price').values('price')[:1]
+    )
+
+
+def _next_free_slots(spaces, now):
+    """{space_id: next free slot start} for a batch, with one reservation query and one rule query."""
+    from apps.reservations.models import Reservation
+
+    first_day = timezone.localdate(now)
+    range_end = now + timedelta(days=LOOKAHEAD_DAYS + 1)
+    space_ids = [space.pk for space in spaces]
+
+    periods = {}
+    for space_id, start_at, end_at in (
+        Reservation.objects.active().overlapping(now, range_end)
+        .filter(space_id__in=space_ids).values_list('space_id', 'start_at', 'end_at')
+    ):
+        periods.setdefault(space_id, []).append((start_at, end_at))
+
+    # Compiled availability when present, otherwise compile from one batched rule query
+    uncompiled = [space.pk for space in spaces if space.availability_intervals is None]
+    rules = {}
+    for rule in AvailabilityRule.objects.filter(space_id__in=uncompiled):
+        rules.setdefault(rule.space_id, []).append(rule)
+
+    result = {}
+    for space in spaces:
+        intervals = space.availability_intervals
+        if intervals is None:
+            intervals = compile_rules(rules.get(space.pk, []))
+        calendar = build_slot_calendar(
+            intervals, periods.get(space.pk, []), first_day, LOOKAHEAD_DAYS, now, space.capacity,
+        )
+        result[space.pk] = first_free_slot(calendar)
+    return result
+
+
+def refresh_cards(space_ids, update_tiles=True):
+    """
+    Recompute the cards of the given spaces (missing spaces are dropped by
+    cascade), then rewrite the map tiles they were and are in.
+    """
+    space_ids = list(space_ids)
+    now = timezone.now()
+    cover_images = SpaceImage.objects.filter(space=OuterRef('pk')).order_by('created_at', 'id')
+    for offset in range(0, len(space_ids), BATCH_SIZE):
+        batch = space_ids[offset:offset + BATCH_SIZE]
+        tiles = set()
+        if update_tiles:
+            tiles = {tile_of(lat, lng) for lat, lng in SpaceCard.objects.filter(pk__in=batch).values_list('lat', 'lng')}
+        spaces = list(
+            Space.objects.filter(pk__in=batch).annotate(
+                hourly_price=_product_price(SpaceProduct.ProductType.HOURLY),
+                day_pass_price=_product_price(SpaceProduct.ProductType.DAY_PASS),
+                cover_image=Subquery(cover_images.values('image')[:1]),
+                cover_thumbnail=Subquery(cover_images.values(path=Coalesce(
+                    KT(f'renditions__{CARD_RENDITION}__webp'), KT(f'renditions__{CARD_RENDITION}__jpeg'),
+                ))[:1]),
+            )
+        )
+        next_free = _next_free_slots(spaces, now)
+        SpaceCard.objects.bulk_create(
+            [
+                SpaceCard(
+                    space_id=space.pk, title=space.title, address=space.address,
+                    lat=space.lat, lng=space.lng,
+                    is_active=space.is_active, is_auto_approval=space.is_auto_approval,
+                    cover_image=space.cover_image or '', cover_thumbnail=space.cover_thumbnail or '',
+                    hourly_price=space.hourly_price, day_pass_price=space.day_pass_price,
+                    next_free_at=next_free[space.pk], refreshed_at=now,
+                )
+                for space in spaces
+            ],
+            update_conflicts=True,
+            unique_fields=['space'],
+            update_fields=[
+                'title', 'address', 'lat', 'lng', 'is_active', 'is_auto_approval', 'cover_image', 'cover_thumbnail',
+                'hourly_price', 'day_pass_price', 'next_free_at', 'refreshed_at',
+            ],
+        )
+        if update_tiles:
+            refresh_tiles(tiles | {tile_of(space.lat, space.lng) for space in spaces})
+
+
+def schedule_card_refresh(space_id):
+    """Refresh a space's card when the current transaction commits, once per transaction."""
+    on_commit_once(('space-card', space_id), lambda: refresh_cards([space_id]))
+
+
+def refresh_all_cards():
+    ids = list(Space.objects.values_list('pk', flat=True))
+    refresh_cards(ids, update_tiles=False)
+    rebuild_tiles()
+    return len(ids)
@@ -0,0 +1,123 @@
+"""
+Per-zoom grid aggregates of active spaces for map clustering.
+
+A cluster cell at zoom z is a tile of zoom z + CELL_ZOOM_OFFSET, i.e. a
+64px square on screen, so a viewport never holds more than a few hundred
+cells whatever the size of the catalog. Cells are stored in SpaceCluster and
+refreshed incrementally from Space/SpaceProduct writes (see signals.py).
+"""
+from django.db import transaction
+from django.db.models import Avg, Count, F, FilteredRelation, Func, IntegerField, Min, Q, Value
+from .geo import GRID_BITS, grid_xy
+from .models import Space, SpaceCluster, SpaceProduct
+
+MIN_ZOOM = 6
+MAX_ZOOM = 16
+CELL_ZOOM_OFFSET = 2
+ZOOM_LEVELS = range(MIN_ZOOM, MAX_ZOOM + 1)
+
+
+class RightShift(Func):
+    template = '(%(expressions)s)'
+    arg_joiner = ' >> '
+    output_field = IntegerField()
+
+
+def cell_shift(zoom):
+    return GRID_BITS - (zoom + CELL_ZOOM_OFFSET)
+
+
+def cell_of(grid_x, grid_y, zoom):
+    shift = cell_shift(zoom)
+    return grid_x >> shift, grid_y >> shift
+
+
+def _clusterable_spaces():
+    # At most one active HOURLY product per space (unique on space/type), so the
+    # filtered join does not duplicate rows in the aggregates.
+    return Space.objects.filter(is_active=True).annotate(
+        hourly=FilteredRelation(
+            'products',
+            condition=Q(products__type=SpaceProduct.ProductType.HOURLY, products__is_active=True),
+        ),
+    )
+
+
+def _aggregate_cells(zoom, queryset):
+    shift = cell_shift(zoom)
+    rows = (
+        queryset
+        .annotate(cell_x=RightShift(F('grid_x'), Value(shift)), cell_y=RightShift(F('grid_y'), Value(shift)))
+        .values('cell_x', 'cell_y')
+        .annotate(count=Count('id'), lat=Avg('lat'), lng=Avg('lng'), min_hourly_price=Min('hourly__price'))
+        .order_by()
+    )
+    return [
+        SpaceCluster(
+            zoom=zoom, cell_x=row['cell_x'], cell_y=row['cell_y'], count=row['count'],
+            lat=float(row['lat']), lng=float(row['lng']), min_hourly_price=row['min_hourly_price'],
+        )
+        for row in rows
+    ]
+
+
+def _save_cells(zoom, clusters, cells):
+    """Upsert the recomputed clusters and drop cells of `cells` that became empty."""
+    SpaceCluster.objects.bulk_create(
+        clusters,
+        update_conflicts=True,
+        unique_fields=['zoom', 'cell_x', 'cell_y'],
+        update_fields=['count', 'lat', 'lng', 'min_hourly_price'],
+    )
+    filled = {(c.cell_x, c.cell_y) for c in clusters}
+    empty = Q()
+    for cell_x, cell_y in cells:
+        if (cell_x, cell_y) not in filled:
+            empty |= Q(cell_x=cell_x, cell_y=cell_y)
+    if empty:
+        SpaceCluster.objects.filter(empty, zoom=zoom).delete()
+
+
+def refresh_clusters(grid_points):
+    """
+    Recompute the cells containing the given grid positions, at every zoom level.
+    One aggregate query per zoom level, regardless of how many points are passed.
+    """
+    grid_points = set(grid_points)
+    if not grid_points:
+        return
+    with transaction.atomic():
+        for zoom in ZOOM_LEVELS:
+            shift = cell_shift(zoom)
+            cells = {cell_of(x, y, zoom) for x, y in grid_points}
+            in_cells = Q()
+            for cell_x, cell_y in cells:
+                in_cells |= Q(
+                    grid_x__gte=cell_x << shift, grid_x__lt=(cell_x + 1) << shift,
+                    grid_y__gte=cell_y << shift, grid_y__lt=(cell_y + 1) << shift,
+                )
+            clusters = _aggregate_cells(zoom, _clusterable_spaces().filter(in_cells))
+            _save_cells(zoom, clusters, cells)
+
+
+def rebuild_clusters():
+    """Recompute every cluster from scratch."""
+    with transaction.atomic():
+        SpaceCluster.objects.all().delete()
+        for zoom in ZOOM_LEVELS:
+            SpaceCluster.objects.bulk_create(_aggregate_cells(zoom, _clusterable_spaces()), batch_size=1000)
+
+
+def clusters_in_viewport(bbox, zoom):
+    """Clusters whose cell intersects bbox (south, west, north, east) at the given zoom."""
+    zoom = max(MIN_ZOOM, min(int(zoom), MAX_ZOOM))
+    south, west, north, east = bbox
+    # Grid y grows southwards
+    min_x, min_y = cell_of(*grid_xy(north, west), zoom)
+    max_x, max_y = cell_of(*grid_xy(south, east), zoom)
+    clusters = SpaceCluster.objects.filter(
+        zoom=zoom,
+        cell_x__gte=min_x, cell_x__lte=max_x,
+        cell_y__gte=min_y, cell_y__lte=max_y,
+    )
+    return zoom, clusters
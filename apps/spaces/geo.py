@@ -0,0 +1,170 @@
+"""
+Spatial helpers for Space lookups.
+
+Queries go through the Postgres cube/earthdistance extensions. The GiST index
+on ll_to_earth(lat, lng) (see Space.Meta.indexes) serves both the
+earth_box() containment prefilter and the <-> KNN ordering, so radius,
+bounding-box and nearest-N lookups are all a single index scan.
+"""
+import math
+from django.db import models
+from django.db.models import FloatField, BooleanField, Func, Value
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+
+# earthdistance's earth() radius, in meters. Distances it returns use this value.
+EARTH_RADIUS_M = 6378168.0
+
+MAX_RADIUS_M = 50000
+MAX_NEAREST = 100
+
+# Web Mercator grid used for map clustering: a 2^GRID_BITS x 2^GRID_BITS
+# raster of the world, i.e. the tile grid of zoom level GRID_BITS.
+GRID_BITS = 24
+MAX_MERCATOR_LAT = 85.05112878
+
+
+class LlToEarth(Func):
+    function = 'll_to_earth'
+    output_field = models.Field()
+
+
+class EarthBox(Func):
+    function = 'earth_box'
+    output_field = models.Field()
+
+
+class EarthDistance(Func):
+    function = 'earth_distance'
+    output_field = FloatField()
+
+
+class CubeContains(Func):
+    template = '(%(expressions)s)'
+    arg_joiner = ' @> '
+    output_field = BooleanField()
+
+
+class CubeDistance(Func):
+    # Euclidean (chord) distance between two earth points. Monotonic with the
+    # great-circle distance and supported by GiST KNN ordering.
+    template = '(%(expressions)s)'
+    arg_joiner = ' <-> '
+    output_field = FloatField()
+
+
+def space_point():
+    return LlToEarth(Cast('lat', FloatField()), Cast('lng', FloatField()))
+
+
+def point(lat, lng):
+    return LlToEarth(Value(float(lat), output_field=FloatField()), Value(float(lng), output_field=FloatField()))
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def grid_xy(lat, lng):
+    """Position of (lat, lng) on the GRID_BITS Web Mercator grid."""
+    lat = max(min(float(lat), MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT)
+    size = 1 << GRID_BITS
+    x = (float(lng) + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(int(x * size), 0), size - 1), min(max(int(y * size), 0), size - 1)
+
+
+def _float_param(params, name, low, high):
+    if name not in params:
+        raise ValidationError({name: 'This parameter is required.'})
+    try:
+        value = float(params[name])
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Must be a number.'})
+    if not (low <= value <= high) or math.isnan(value):
+        raise ValidationError({name: f'Must be between {low} and {high}.'})
+    return value
+
+
+def parse_bbox(value):
+    """Parse 'south,west,north,east' into floats."""
+    try:
+        south, west, north, east = (float(v) for v in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValidationError({'bbox': 'Expected "south,west,north,east".'})
+    if not (-90 <= south <= north <= 90) or not (-180 <= west <= east <= 180):
+        raise ValidationError({'bbox': 'Invalid bounding box.'})
+    return south, west, north, east
+
+
+def parse_geo_params(params):
+    """
+    Read the geo query parameters of the space list.
+
+    Returns None when no geo parameter is present, otherwise a dict with the
+    search center and either a radius (meters), a bbox or a nearest-N limit.
+    """
+    if 'bbox' in params:
+        south, west, north, east = parse_bbox(params['bbox'])
+        center = ((south + north) / 2, (west + east) / 2)
+        # The circle around the box center that reaches its farthest corner
+        # lets the GiST index prefilter, the exact lat/lng ranges do the rest.
+        radius = max(
+            haversine_m(center[0], center[1], corner_lat, corner_lng)
+            for corner_lat in (south, north) for corner_lng in (west, east)
+        )
+        return {
+            'center': center,
+            'bbox': (south, west, north, east),
+            'radius': radius + 1,
+            'nearest': None,
+        }
+
+    if 'lat' not in params and 'lng' not in params:
+        return None
+
+    # lat and lng come together; either one alone is rejected by _float_param
+    center = (_float_param(params, 'lat', -90, 90), _float_param(params, 'lng', -180, 180))
+    nearest = None
+    if 'nearest' in params:
+        try:
+            nearest = int(params['nearest'])
+        except ValueError:
+            raise ValidationError({'nearest': 'Must be an integer.'})
+        if not (1 <= nearest <= MAX_NEAREST):
+            raise ValidationError({'nearest': f'Must be between 1 and {MAX_NEAREST}.'})
+    if 'radius' in params:
+        radius = _float_param(params, 'radius', 1, MAX_RADIUS_M)
+    elif nearest is not None:
+        radius = None
+    else:
+        raise ValidationError({'radius': 'Either radius or nearest is required with lat/lng.'})
+    return {'center': center, 'bbox': None, 'radius': radius, 'nearest': nearest}
+
+
+def filter_geo(queryset, geo):
+    """
+    Apply a parsed geo query to a Space queryset.
+
+    Annotates 'knn' (index-ordered chord distance) and 'distance' (meters) and
+    orders by ('knn', 'pk') so results can be keyset-paginated by distance.
+    """
+    center = point(*geo['center'])
+    queryset = queryset.annotate(
+        knn=CubeDistance(space_point(), center),
+        distance=EarthDistance(center, space_point()),
+    )
+    if geo['radius'] is not None:
+        queryset = queryset.filter(
+            CubeContains(EarthBox(center, Value(geo['radius'], output_field=FloatField())), space_point()),
+            distance__lte=geo['radius'],
+        )
+    if geo['bbox'] is not None:
+        south, west, north, east = geo['bbox']
+        queryset = queryset.filter(lat__range=(south, north), lng__range=(west, east))
+    return queryset.order_by('knn', 'pk')
@@ -0,0 +1,115 @@
+"""
+Bulk import of spaces from CSV or NDJSON.
+
+Each record is a space as accepted by SpaceSerializer. In NDJSON the nested
+products and availability_rules are plain lists; in CSV they are columns
+holding the same lists as JSON text (like multipart space uploads).
+
+Records are validated with SpaceSerializer in batches of BATCH_SIZE, which
+needs no queries, and every valid record of a batch is loaded with one
+bulk_create per table inside one transaction. Invalid records are skipped
+and reported by row number. Bulk inserts bypass Space.save() and the save
+signals, so grid positions are computed here and the derived data (search
+vectors, cards, tiles and clusters) is refreshed once per batch.
+"""
+import csv
+import io
+import json
+from django.db import transaction
+from .cards import refresh_cards
+from .clusters import refresh_clusters
+from .geo import grid_xy
+from .models import Space, SpaceProduct, AvailabilityRule
+from .search import update_search_vectors
+from .serializers import SpaceSerializer
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ('csv', 'ndjson')
+
+
+def guess_format(filename):
+    return 'csv' if filename.lower().endswith('.csv') else 'ndjson'
+
+
+def read_records(stream, fmt):
+    """Yield (row number, record or None) from a binary stream; None means unparsable."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        # Row numbers count data rows, the header is row 0
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, {key: value for key, value in row.items() if key and value != ''}
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def _load_batch(host, batch):
+    """Insert the validated records of a batch; returns the new space ids."""
+    spaces, nested = [], []
+    for data in batch:
+        rules = data.pop('availability_rules', [])
+        products = data.pop('products', [])
+        space = Space(host=host, **data)
+        space.grid_x, space.grid_y = grid_xy(space.lat, space.lng)
+        spaces.append(space)
+        nested.append((rules, products))
+
+    with transaction.atomic():
+        Space.objects.bulk_create(spaces)
+        AvailabilityRule.objects.bulk_create([
+            AvailabilityRule(space=space, **rule)
+            for space, (rules, _) in zip(spaces, nested) for rule in rules
+        ])
+        SpaceProduct.objects.bulk_create([
+            SpaceProduct(space=space, **product)
+            for space, (_, products) in zip(spaces, nested) for product in products
+        ])
+        space_ids = [space.pk for space in spaces]
+        update_search_vectors(space_ids)
+        points = [(space.grid_x, space.grid_y) for space in spaces]
+        transaction.on_commit(lambda: refresh_cards(space_ids))
+        transaction.on_commit(lambda: refresh_clusters(points))
+    return space_ids
+
+
+def import_spaces(host, records, dry_run=False):
+    """
+    Validate and load (row number, record) pairs for `host`.
+
+    Returns {'created', 'failed', 'errors'} where errors lists the first
+    MAX_REPORTED_ERRORS failures as {'row', 'errors'}.
+    """
+    report = {'created': 0, 'failed': 0, 'errors': []}
+
+    def fail(number, errors):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': number, 'errors': errors})
+
+    def flush(batch):
+        if batch and not dry_run:
+            _load_batch(host, batch)
+        report['created'] += len(batch)
+
+    batch = []
+    for number, record in records:
+        if record is None:
+            fail(number, {'non_field_errors': ['Invalid record.']})
+            continue
+        serializer = SpaceSerializer(data=record)
+        if not serializer.is_valid():
+            fail(number, serializer.errors)
+            continue
+        batch.append(serializer.validated_data)
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+    flush(batch)
+    return report
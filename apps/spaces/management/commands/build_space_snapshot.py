@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.spaces.snapshot import build_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write the memory-mapped snapshot of active space cards read by the workers.'
+
+    def handle(self, *args, **options):
+        count = build_snapshot()
+        self.stdout.write(self.style.SUCCESS(f'Snapshot written with {count} spaces.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.spaces.tiles import rebuild_tiles
+
+
+class Command(BaseCommand):
+    help = 'Rewrite every static GeoJSON map tile from the space cards and remove stale tiles.'
+
+    def handle(self, *args, **options):
+        tiles, changed = rebuild_tiles()
+        self.stdout.write(self.style.SUCCESS(f'{tiles} tiles with spaces, {changed} files written or removed.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from apps.spaces.models import SpaceImage
+from apps.spaces.renditions import generate_renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG renditions of space images that have none yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render every image, overwriting existing renditions.')
+
+    def handle(self, *args, **options):
+        images = SpaceImage.objects.order_by('pk')
+        force = options['all']
+        if not force:
+            images = images.filter(renditions={})
+        count = 0
+        for image_id in images.values_list('pk', flat=True).iterator():
+            try:
+                generate_renditions(image_id, force=force)
+                count += 1
+            except (OSError, ValueError) as e:
+                self.stderr.write(f'SpaceImage {image_id}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {count} images.'))
@@ -0,0 +1,29 @@
+import json
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from apps.spaces.importer import import_spaces, read_records, guess_format, FORMATS
+
+
+class Command(BaseCommand):
+    help = 'Bulk import spaces for a host from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--host', required=True, help='Username of the owning host.')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only.')
+
+    def handle(self, *args, **options):
+        try:
+            host = get_user_model().objects.get(username=options['host'], is_host=True)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No host named {options['host']}.")
+
+        fmt = options['format'] or guess_format(options['path'])
+        with open(options['path'], 'rb') as f:
+            report = import_spaces(host, read_records(f, fmt), dry_run=options['dry_run'])
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {report['created']} spaces, {report['failed']} rows failed."))
@@ -0,0 +1,36 @@
+import os
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.spaces.models import UploadSession
+from apps.spaces.uploads import remove_session_file
+
+
+class Command(BaseCommand):
+    help = 'Delete upload sessions and pending local uploads that were abandoned.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Age after which an unfinished upload is abandoned.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        sessions = 0
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff).exclude(status=UploadSession.Status.COMPLETED)
+        for session in stale.iterator():
+            remove_session_file(session)
+            session.delete()
+            sessions += 1
+
+        # Presigned PUTs to the local store that were never confirmed
+        files = 0
+        pending = os.path.join(settings.MEDIA_ROOT, 'uploads', 'pending')
+        oldest = time.time() - options['hours'] * 3600
+        for directory, _, names in os.walk(pending):
+            for name in names:
+                path = os.path.join(directory, name)
+                if os.path.getmtime(path) < oldest:
+                    os.remove(path)
+                    files += 1
+        self.stdout.write(self.style.SUCCESS(f'Removed {sessions} upload sessions and {files} pending files.'))
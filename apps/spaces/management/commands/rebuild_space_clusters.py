@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from apps.spaces.clusters import rebuild_clusters
+from apps.spaces.models import SpaceCluster
+
+
+class Command(BaseCommand):
+    help = 'Recompute all precomputed map clusters from the space catalog.'
+
+    def handle(self, *args, **options):
+        rebuild_clusters()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {SpaceCluster.objects.count()} clusters.'))
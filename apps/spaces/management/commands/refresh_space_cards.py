@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.spaces.cards import refresh_all_cards
+
+
+class Command(BaseCommand):
+    help = 'Recompute every space card (prices, cover image, next free slot).'
+
+    def handle(self, *args, **options):
+        count = refresh_all_cards()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {count} space cards.'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:34
+
+import apps.spaces.geo
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import CreateExtension
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("spaces", "0004_space_is_auto_approval"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        CreateExtension("cube"),
+        CreateExtension("earthdistance"),
+        migrations.AddIndex(
+            model_name="space",
+            index=django.contrib.postgres.indexes.GistIndex(
+                apps.spaces.geo.LlToEarth(
+                    django.db.models.functions.comparison.Cast(
+                        "lat", models.FloatField()
+                    ),
+                    django.db.models.functions.comparison.Cast(
+                        "lng", models.FloatField()
+                    ),
+                ),
+                name="space_earth_gist_idx",
+            ),
+        ),
+    ]
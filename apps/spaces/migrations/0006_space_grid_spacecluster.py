@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.spaces.geo import grid_xy
+
+
+def backfill_grid(apps, schema_editor):
+    Space = apps.get_model("spaces", "Space")
+    spaces = list(Space.objects.only("id", "lat", "lng"))
+    for space in spaces:
+        space.grid_x, space.grid_y = grid_xy(space.lat, space.lng)
+    Space.objects.bulk_update(spaces, ["grid_x", "grid_y"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("spaces", "0005_space_earth_gist_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpaceCluster",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("zoom", models.PositiveSmallIntegerField()),
+                ("cell_x", models.IntegerField()),
+                ("cell_y", models.IntegerField()),
+                ("count", models.PositiveIntegerField()),
+                ("lat", models.FloatField()),
+                ("lng", models.FloatField()),
+                ("min_hourly_price", models.IntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="space",
+            name="grid_x",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="space",
+            name="grid_y",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_grid, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="space",
+            index=models.Index(fields=["grid_x", "grid_y"], name="space_grid_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="spacecluster",
+            constraint=models.UniqueConstraint(
+                fields=("zoom", "cell_x", "cell_y"), name="unique_space_cluster_cell"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("spaces", "0006_space_grid_spacecluster"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="space",
+            name="availability_intervals",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="space",
+            name="availability_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:40
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("spaces", "0007_space_availability_intervals"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="space",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE spaces_space SET search_vector =
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('simple', coalesce(address, '')), 'B')
+                || setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="space",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="space_search_vector_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="space",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"],
+                name="space_title_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="space",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["address"],
+                name="space_address_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:42
+
+import apps.spaces.geo
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("spaces", "0008_space_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpaceCard",
+            fields=[
+                (
+                    "space",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="card",
+                        serialize=False,
+                        to="spaces.space",
+                    ),
+                ),
+                ("title", models.CharField(max_length=100)),
+                ("address", models.CharField(max_length=255)),
+                ("lat", models.DecimalField(decimal_places=6, max_digits=9)),
+                ("lng", models.DecimalField(decimal_places=6, max_digits=9)),
+                ("is_active", models.BooleanField(default=True)),
+                ("is_auto_approval", models.BooleanField(default=True)),
+                (
+                    "cover_image",
+                    models.ImageField(blank=True, max_length=255, upload_to="spaces/"),
+                ),
+                ("hourly_price", models.IntegerField(blank=True, null=True)),
+                ("day_pass_price", models.IntegerField(blank=True, null=True)),
+                ("next_free_at", models.DateTimeField(blank=True, null=True)),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GistIndex(
+                        apps.spaces.geo.LlToEarth(
+                            django.db.models.functions.comparison.Cast(
+                                "lat", models.FloatField()
+                            ),
+                            django.db.models.functions.comparison.Cast(
+                                "lng", models.FloatField()
+                            ),
+                        ),
+                        condition=models.Q(("is_active", True)),
+                        name="spacecard_earth_gist_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("spaces", "0009_spacecard"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpaceTombstone",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("space_id", models.IntegerField()),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="space",
+            index=models.Index(
+                fields=["updated_at", "id"], name="space_updated_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="spacetombstone",
+            index=models.Index(
+                fields=["deleted_at", "id"], name="spacetombstone_deleted_idx"
+            ),
+        ),
+    ]
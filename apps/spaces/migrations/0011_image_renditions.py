@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("spaces", "0010_space_sync"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="spacecard",
+            name="cover_thumbnail",
+            field=models.ImageField(blank=True, max_length=255, upload_to="spaces/"),
+        ),
+        migrations.AddField(
+            model_name="spaceimage",
+            name="renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:51
+
+import apps.spaces.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("spaces", "0011_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="spaceimage",
+            name="image",
+            field=models.ImageField(
+                storage=apps.spaces.storage.ContentAddressedStorage(),
+                upload_to="spaces/",
+            ),
+        ),
+    ]
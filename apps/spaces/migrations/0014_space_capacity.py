@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:00
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("spaces", "0013_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="space",
+            name="capacity",
+            field=models.PositiveIntegerField(
+                default=1, validators=[django.core.validators.MinValueValidator(1)]
+            ),
+        ),
+    ]
@@ -1,6 +1,12 @@
+import uuid
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+from django.contrib.postgres.indexes import GistIndex, GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from .geo import space_point, grid_xy
+from .storage import space_image_storage
 
 class Space(models.Model):
     host = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='spaces')
@@ -12,9 +18,46 @@ class Space(models.Model):
     # image field removed, using SpaceImage model instead
     is_active = models.BooleanField(default=True)
     is_auto_approval = models.BooleanField(default=True)
+    # Stalls that can be booked at the same time, e.g. the size of a garage
+    capacity = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    # Web Mercator grid position, derived from lat/lng on save (see geo.grid_xy)
+    grid_x = models.IntegerField(default=0, editable=False)
+    grid_y = models.IntegerField(default=0, editable=False)
+    # Compiled availability rules as merged minute-of-week intervals (see availability.py), null until compiled
+    availability_intervals = models.JSONField(null=True, blank=True, editable=False)
+    availability_version = models.PositiveIntegerField(default=0, editable=False)
+    # Weighted tsvector of title/address/description, maintained by search.update_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves radius / bbox containment and KNN distance ordering (see geo.py)
+            GistIndex(space_point(), name='space_earth_gist_idx'),
+            models.Index(fields=['grid_x', 'grid_y'], name='space_grid_idx'),
+            GinIndex(fields=['search_vector'], name='space_search_vector_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='space_title_trgm_idx'),
+            GinIndex(fields=['address'], opclasses=['gin_trgm_ops'], name='space_address_trgm_idx'),
+            # Keyset scans of the delta-sync feed (see sync.py)
+            models.Index(fields=['updated_at', 'id'], name='space_updated_id_idx'),
+        ]
+
+    # Columns maintained outside of save(); a save never writes back its in-memory copy
+    DERIVED_FIELDS = ('availability_intervals', 'availability_version', 'search_vector')
+
+    def save(self, *args, **kwargs):
+        # Remember the previous grid cell so derived map data can be refreshed for both positions
+        self._previous_grid = (self.grid_x, self.grid_y) if self.pk else None
+        if self.lat is not None and self.lng is not None:
+            self.grid_x, self.grid_y = grid_xy(self.lat, self.lng)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.attname for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
@@ -26,12 +69,48 @@ class Space(models.Model):
 
 class SpaceImage(models.Model):
     space = models.ForeignKey(Space, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='spaces/')
+    # Stored by content hash and shared between identical uploads (see storage.py)
+    image = models.ImageField(upload_to='spaces/', storage=space_image_storage)
+    # {name: {format: storage path}} of resized copies, filled in by apps.spaces.renditions
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Image for {self.space.title}"
 
+class UploadSession(models.Model):
+    """
+    A resumable, chunked image upload (see apps.spaces.uploads). Chunks are
+    appended to a file on disk; finalizing turns it into a SpaceImage.
+    """
+    class Status(models.TextChoices):
+        OPEN = 'OPEN', 'Open'
+        COMPLETED = 'COMPLETED', 'Completed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    space = models.ForeignKey(Space, on_delete=models.CASCADE, related_name='upload_sessions')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=50)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.OPEN)
+    image = models.ForeignKey(SpaceImage, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def next_chunk(self):
+        return self.received // self.chunk_size
+
+    @property
+    def chunk_count(self):
+        return -(-self.size // self.chunk_size)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received}/{self.size})"
+
 class AvailabilityRule(models.Model):
     space = models.ForeignKey(Space, on_delete=models.CASCADE, related_name='availability_rules')
     day_of_week = models.IntegerField(choices=[
@@ -65,3 +144,64 @@ class SpaceProduct(models.Model):
     def clean(self):
         if self.price < 0:
             raise ValidationError({'price': 'Price must be positive.'})
+
+class SpaceCluster(models.Model):
+    """
+    Precomputed map cluster: active spaces aggregated per grid cell and zoom level.
+    Maintained incrementally by apps.spaces.clusters.
+    """
+    zoom = models.PositiveSmallIntegerField()
+    cell_x = models.IntegerField()
+    cell_y = models.IntegerField()
+    count = models.PositiveIntegerField()
+    lat = models.FloatField()
+    lng = models.FloatField()
+    min_hourly_price = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['zoom', 'cell_x', 'cell_y'], name='unique_space_cluster_cell'),
+        ]
+
+    def __str__(self):
+        return f"Cluster z{self.zoom} ({self.cell_x}, {self.cell_y}): {self.count}"
+
+class SpaceTombstone(models.Model):
+    """Record of a deleted space, so delta-sync clients learn about hard deletes."""
+    space_id = models.IntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='spacetombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tombstone for space {self.space_id}"
+
+class SpaceCard(models.Model):
+    """
+    Denormalized list/map summary of a space, one row per space.
+    Maintained by apps.spaces.cards from space and reservation writes.
+    """
+    space = models.OneToOneField(Space, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    title = models.CharField(max_length=100)
+    address = models.CharField(max_length=255)
+    lat = models.DecimalField(max_digits=9, decimal_places=6)
+    lng = models.DecimalField(max_digits=9, decimal_places=6)
+    is_active = models.BooleanField(default=True)
+    is_auto_approval = models.BooleanField(default=True)
+    cover_image = models.ImageField(upload_to='spaces/', max_length=255, blank=True)
+    cover_thumbnail = models.ImageField(upload_to='spaces/', max_length=255, blank=True)
+    hourly_price = models.IntegerField(null=True, blank=True)
+    day_pass_price = models.IntegerField(null=True, blank=True)
+    next_free_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            GistIndex(space_point(), condition=models.Q(is_active=True), name='spacecard_earth_gist_idx'),
+        ]
+
+    def __str__(self):
+        return f"Card for {self.title}"
@@ -0,0 +1,128 @@
+"""
+Resized WebP/JPEG renditions of SpaceImage uploads.
+
+Originals are kept as uploaded; for every RENDITION_SIZES entry a copy that
+fits in a size x size box is written as WebP and JPEG next to them, named
+after the original (spaces/3f/a2/<hash>.thumb.webp). Their storage names are
+stored in SpaceImage.renditions as {name: {format: path}}. Since originals
+are content-addressed (see storage.py), identical uploads share renditions,
+and renditions live and die with their original.
+
+Renditions are generated off the request path: uploads schedule them on
+commit onto a small per-process thread pool. 'manage.py
+generate_image_renditions' fills in images whose renditions are missing,
+e.g. after a worker restart dropped queued jobs.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps, features
+from .models import SpaceImage
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; originals are never upscaled
+RENDITION_SIZES = {'thumb': 320, 'medium': 800, 'large': 1600}
+CARD_RENDITION = 'thumb'
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# An unreferenced original touched this recently may belong to an upload still in flight
+RELEASE_GRACE_SECONDS = 600
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='renditions')
+
+
+def rendition_path(original_name, name, fmt):
+    base = os.path.splitext(original_name)[0]
+    return f'{base}.{name}.{"jpg" if fmt == "jpeg" else fmt}'
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render(fileobj):
+    """{name: {format: bytes}} of the renditions of an image file."""
+    with Image.open(fileobj) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+    formats = ['webp', 'jpeg'] if features.check('webp') else ['jpeg']
+    renditions = {}
+    for name, size in RENDITION_SIZES.items():
+        image = original.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        renditions[name] = {fmt: _encode(image, fmt) for fmt in formats}
+    return renditions
+
+
+def generate_renditions(image_id, force=False):
+    """
+    Write the renditions of one image and record them. Renditions already on
+    disk (from an identical upload) are reused unless force is set. Returns
+    False if the image is gone.
+    """
+    image = SpaceImage.objects.filter(pk=image_id).first()
+    if image is None:
+        return False
+    original = image.image.name
+    formats = ['webp', 'jpeg'] if features.check('webp') else ['jpeg']
+    paths = {name: {fmt: rendition_path(original, name, fmt) for fmt in formats} for name in RENDITION_SIZES}
+
+    if force or not all(default_storage.exists(path) for files in paths.values() for path in files.values()):
+        with image.image.open('rb') as f:
+            rendered = render(f)
+        for name, files in paths.items():
+            for fmt, path in files.items():
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                default_storage.save(path, ContentFile(rendered[name][fmt]))
+    SpaceImage.objects.filter(pk=image_id).update(renditions=paths)
+
+    from .cards import refresh_cards
+    refresh_cards([image.space_id])
+    return True
+
+
+def _run(image_ids):
+    try:
+        for image_id in image_ids:
+            try:
+                generate_renditions(image_id)
+            except Exception:
+                logger.exception('Rendition generation failed for SpaceImage %s', image_id)
+    finally:
+        connection.close()
+
+
+def schedule_renditions(image_ids):
+    """Generate renditions in the background once the current transaction commits."""
+    image_ids = list(image_ids)
+    if image_ids:
+        transaction.on_commit(lambda: _executor.submit(_run, image_ids))
+
+
+def release_image(name, renditions):
+    """
+    Delete an original and its renditions once no SpaceImage references it
+    (one query). Call after the deleting transaction committed.
+    """
+    storage = SpaceImage._meta.get_field('image').storage
+    if not name or SpaceImage.objects.filter(image=name).exists():
+        return False
+    if hasattr(storage, 'recently_used') and storage.recently_used(name, RELEASE_GRACE_SECONDS):
+        # Possibly just re-uploaded by a request that has not committed yet
+        return False
+    for files in (renditions or {}).values():
+        for path in files.values():
+            default_storage.delete(path)
+    storage.delete(name)
+    return True
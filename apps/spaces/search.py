@@ -0,0 +1,96 @@
+"""
+Space search: text relevance and "available near me for this window".
+
+Both are expressed as one SQL statement each. Text search combines the
+weighted tsvector column with trigram word similarity on title/address
+(GIN indexed), which also matches Korean fragments that the 'simple'
+text search configuration does not split into words.
+
+For availability, geo filtering, rule coverage and the free stall check
+against overlapping reservations run in the same query, so thousands of candidate spaces are
+ranked in a single round trip instead of re-running the reservation
+validation per space.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db.models import Count, Exists, F, FilteredRelation, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Greatest
+from apps.reservations.models import Reservation
+from .availability import covered_by_rules_q
+from .geo import filter_geo
+from .models import Space, SpaceProduct
+
+SEARCH_CONFIG = 'simple'
+
+RESULT_FIELDS = ['id', 'title', 'address', 'lat', 'lng', 'is_auto_approval', 'distance', 'product_id', 'price_total']
+
+
+def update_search_vector(space_id):
+    update_search_vectors([space_id])
+
+
+def update_search_vectors(space_ids):
+    Space.objects.filter(pk__in=space_ids).update(search_vector=(
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('address', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    ))
+
+
+def filter_text(queryset, q):
+    """Spaces matching q, annotated with 'rank' and ordered by relevance."""
+    query = SearchQuery(q, config=SEARCH_CONFIG, search_type='websearch')
+    return (
+        queryset
+        .filter(
+            Q(search_vector=query)
+            | Q(title__trigram_word_similar=q)
+            | Q(address__trigram_word_similar=q)
+        )
+        # ts_rank and similarity are float4; casting the sum to float8 lets the keyset
+        # cursor round-trip it exactly, and a NULL search_vector ranks 0 instead of
+        # sorting first under DESC
+        .annotate(rank=Cast(
+            Coalesce(SearchRank(F('search_vector'), query), Value(0.0))
+            + Greatest(TrigramWordSimilarity(q, 'title'), TrigramWordSimilarity(q, 'address')),
+            FloatField(),
+        ))
+        .order_by('-rank', 'id')
+    )
+
+
+def available_spaces(geo, start_at, end_at, product_type, sort='distance'):
+    """
+    Active spaces near `geo` that are bookable for [start_at, end_at) with a
+    product of `product_type`, as dicts ordered for keyset pagination.
+    """
+    busy = Reservation.objects.active().overlapping(start_at, end_at).filter(space=OuterRef('pk'))
+    busy_count = Subquery(busy.order_by().values('space').annotate(n=Count('pk')).values('n'))
+
+    queryset = (
+        Space.objects.filter(is_active=True)
+        .annotate(offer=FilteredRelation(
+            'products',
+            condition=Q(products__type=product_type, products__is_active=True),
+        ))
+        .filter(offer__isnull=False)
+        .filter(covered_by_rules_q(start_at, end_at))
+        # A single stall must have no overlapping reservation. A lot needs fewer overlapping
+        # reservations than stalls, which may hide one whose reservations never all coincide
+        # (booking itself checks the exact peak).
+        .filter((Q(capacity=1) & ~Exists(busy)) | Q(capacity__gt=Coalesce(busy_count, 0)))
+    )
+    queryset = filter_geo(queryset, geo)
+
+    if product_type == SpaceProduct.ProductType.HOURLY:
+        minutes = int((end_at - start_at).total_seconds() // 60)
+        # Integer division truncates like the reservation serializer's int(hours * price)
+        price_total = F('offer__price') * minutes / 60
+    else:
+        price_total = F('offer__price')
+    queryset = queryset.annotate(product_id=F('offer__id'), price_total=price_total)
+
+    if sort == 'price':
+        queryset = queryset.order_by('price_total', 'knn', 'id')
+    else:
+        queryset = queryset.order_by('knn', 'price_total', 'id')
+    return queryset.values(*RESULT_FIELDS, 'knn')
@@ -1,11 +1,30 @@
 import json
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Space, AvailabilityRule, SpaceProduct, SpaceImage
+from .models import Space, AvailabilityRule, SpaceProduct, SpaceImage, SpaceCluster, SpaceCard, UploadSession
+from .renditions import schedule_renditions
+from .availability import day_window, invalidate_availability, SLOTS_PER_DAY
 
 class SpaceImageSerializer(serializers.ModelSerializer):
+    # {name: {format: url}}, empty until the renditions are generated
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = SpaceImage
-        fields = ['id', 'image', 'created_at']
+        fields = ['id', 'image', 'renditions', 'created_at']
+
+    def get_renditions(self, obj):
+        request = self.context.get('request')
+        urls = {}
+        for name, files in obj.renditions.items():
+            urls[name] = {}
+            for fmt, path in files.items():
+                url = default_storage.url(path)
+                urls[name][fmt] = request.build_absolute_uri(url) if request else url
+        return urls
 
 class AvailabilityRuleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -27,14 +46,133 @@ class SpaceProductSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Price must be positive.")
         return value
 
+class SpaceClusterSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SpaceCluster
+        fields = ['count', 'lat', 'lng', 'min_hourly_price', 'cell_x', 'cell_y']
+
+class SpaceCardSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='space_id', read_only=True)
+    distance = serializers.FloatField(read_only=True) # Meters, only present on geo queries
+
+    class Meta:
+        model = SpaceCard
+        fields = [
+            'id', 'title', 'address', 'lat', 'lng', 'is_auto_approval', 'cover_image', 'cover_thumbnail',
+            'hourly_price', 'day_pass_price', 'next_free_at', 'distance',
+        ]
+        read_only_fields = fields
+
+class AvailableSearchSerializer(serializers.Serializer):
+    """Query parameters of the availability search: an HOURLY window or a DAY_PASS date."""
+    MAX_WINDOW = timedelta(days=7)
+
+    start_at = serializers.DateTimeField(required=False)
+    end_at = serializers.DateTimeField(required=False)
+    date = serializers.DateField(required=False)
+    sort = serializers.ChoiceField(choices=['distance', 'price'], default='distance')
+
+    def validate(self, data):
+        if data.get('date'):
+            if data['date'] < timezone.localdate():
+                raise serializers.ValidationError("과거 날짜는 예약할 수 없습니다.")
+            data['start_at'], data['end_at'] = day_window(data['date'])
+            data['product_type'] = SpaceProduct.ProductType.DAY_PASS
+            return data
+
+        start_at, end_at = data.get('start_at'), data.get('end_at')
+        if not start_at or not end_at:
+            raise serializers.ValidationError("start_at/end_at or date is required.")
+        if start_at >= end_at:
+            raise serializers.ValidationError("종료 시간은 시작 시간보다 뒤이어야 합니다.")
+        if end_at - start_at > self.MAX_WINDOW:
+            raise serializers.ValidationError("Search window cannot exceed 7 days.")
+        data['product_type'] = SpaceProduct.ProductType.HOURLY
+        return data
+
+class SlotCalendarQuerySerializer(serializers.Serializer):
+    MAX_DAYS = 31
+
+    start = serializers.DateField(required=False)
+    days = serializers.IntegerField(required=False, default=7, min_value=1, max_value=MAX_DAYS)
+
+    def validate_start(self, value):
+        if value < timezone.localdate():
+            raise serializers.ValidationError("과거 날짜는 조회할 수 없습니다.")
+        return value
+
+class SlotCalendarDaySerializer(serializers.Serializer):
+    """
+    One day of a slot calendar. free/booked are 48-bit masks as 12 hex digits;
+    bit i (least significant first) is the half hour starting at i * 30 minutes.
+    """
+    date = serializers.DateField()
+    free = serializers.SerializerMethodField()
+    booked = serializers.SerializerMethodField()
+
+    def get_free(self, obj):
+        return f"{obj['free']:0{SLOTS_PER_DAY // 4}x}"
+
+    def get_booked(self, obj):
+        return f"{obj['booked']:0{SLOTS_PER_DAY // 4}x}"
+
+class BulkSpaceFilterSerializer(serializers.Serializer):
+    is_active = serializers.BooleanField(required=False)
+    title = serializers.CharField(required=False) # Contains, case-insensitive
+    address = serializers.CharField(required=False) # Contains, case-insensitive
+
+class BulkSpaceSelectionSerializer(serializers.Serializer):
+    """The spaces a bulk operation applies to: explicit ids or a filter over the host's spaces."""
+    MAX_IDS = 10000
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=MAX_IDS)
+    filter = BulkSpaceFilterSerializer(required=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('filter' in data):
+            raise serializers.ValidationError("Exactly one of ids or filter is required.")
+        return data
+
+class BulkRepriceSerializer(BulkSpaceSelectionSerializer):
+    type = serializers.ChoiceField(choices=SpaceProduct.ProductType.choices)
+    price = serializers.IntegerField(required=False, min_value=0)
+    percent = serializers.IntegerField(required=False, min_value=-100, max_value=1000)
+
+    def validate(self, data):
+        data = super().validate(data)
+        if ('price' in data) == ('percent' in data):
+            raise serializers.ValidationError("Exactly one of price or percent is required.")
+        return data
+
+class PresignUploadSerializer(serializers.Serializer):
+    content_type = serializers.CharField()
+    size = serializers.IntegerField(min_value=1)
+
+class ConfirmUploadSerializer(serializers.Serializer):
+    key = serializers.CharField(max_length=255)
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    next_chunk = serializers.IntegerField(read_only=True)
+    chunk_count = serializers.IntegerField(read_only=True)
+    image = SpaceImageSerializer(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'filename', 'content_type', 'size', 'chunk_size', 'chunk_count', 'received', 'next_chunk',
+            'status', 'image', 'created_at',
+        ]
+        read_only_fields = ['id', 'chunk_size', 'received', 'status', 'created_at']
+
 class SpaceSerializer(serializers.ModelSerializer):
     availability_rules = AvailabilityRuleSerializer(many=True, required=False)
     products = SpaceProductSerializer(many=True, required=False)
     images = SpaceImageSerializer(many=True, read_only=True)
+    distance = serializers.FloatField(read_only=True) # Meters, only present on geo queries
 
     class Meta:
         model = Space
-        fields = ['id', 'host', 'title', 'description', 'address', 'lat', 'lng', 'is_active', 'is_auto_approval', 'created_at', 'images', 'products', 'availability_rules']
+        fields = ['id', 'host', 'title', 'description', 'address', 'lat', 'lng', 'is_active', 'is_auto_approval', 'capacity', 'created_at', 'images', 'products', 'availability_rules', 'distance']
         read_only_fields = ['id', 'host', 'created_at', 'images', 'products']
 
     def validate(self, data):
@@ -66,90 +204,104 @@ class SpaceSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         rules_data = validated_data.pop('availability_rules', [])
         products_data = validated_data.pop('products', [])
-        
-        # Handle images separately since they come from request.FILES usually, 
-        # but DRF might not pass them in validated_data if not in fields?
-        # Actually in ModelSerializer.create, validated_data only has fields that are in serializer.
-        # We need to access context['request'].FILES if we want to handle files manually here 
-        # OR define 'images' as a writeable field but that's tricky with list of files.
-        # Let's inspect context['request'].FILES directly.
-        
-        space = Space.objects.create(**validated_data)
-        
-        for rule_data in rules_data:
-            AvailabilityRule.objects.create(space=space, **rule_data)
-            
-        for product_data in products_data:
-            SpaceProduct.objects.create(space=space, **product_data)
 
-        # Handle images
-        request = self.context.get('request')
-        if request and request.FILES:
-            # multiple images with key 'images'
-            for image_file in request.FILES.getlist('images'):
-                 SpaceImage.objects.create(space=space, image=image_file)
-            
+        # Nested rows are bulk inserted, so their save signals do not fire. The
+        # space's own save schedules the card/cluster refresh for commit time,
+        # which sees them, and a new space has no compiled availability yet.
+        with transaction.atomic():
+            space = Space.objects.create(**validated_data)
+            AvailabilityRule.objects.bulk_create([AvailabilityRule(space=space, **rule) for rule in rules_data])
+            SpaceProduct.objects.bulk_create([SpaceProduct(space=space, **product) for product in products_data])
+            self._add_images(space)
         return space
 
     def update(self, instance, validated_data):
         rules_data = validated_data.pop('availability_rules', None)
         products_data = validated_data.pop('products', None)
 
-        # Update direct fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Update Availability Rules (Safe to replace)
-        if rules_data is not None:
-             instance.availability_rules.all().delete()
-             for rule_data in rules_data:
-                 AvailabilityRule.objects.create(space=instance, **rule_data)
-        
-        # Update Products (Safe update/soft-delete)
-        if products_data is not None:
-            # Create a map by ID and by Type for flexible matching
-            current_products_by_id = {p.id: p for p in instance.products.all()}
-            current_products_by_type = {p.type: p for p in instance.products.all()}
-            
-            # Keep track of which IDs were processed to know what to soft-delete later
-            processed_ids = set()
+        with transaction.atomic():
+            # Update direct fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
 
-            for product_data in products_data:
-                p_id = product_data.get('id')
-                p_type = product_data.get('type')
-                
-                # Try to find existing product by ID first, then by Type
-                product = None
-                if p_id and p_id in current_products_by_id:
-                    product = current_products_by_id[p_id]
-                elif p_type and p_type in current_products_by_type:
-                    product = current_products_by_type[p_type]
-                
-                if product:
-                    # Update existing
-                    processed_ids.add(product.id)
-                    for attr, value in product_data.items():
-                        if attr != 'id': # Don't update ID
-                            setattr(product, attr, value)
-                    product.is_active = True # Ensure active if in payload
-                    product.save()
-                else:
-                    # Create new
-                    if 'id' in product_data: del product_data['id'] 
-                    new_product = SpaceProduct.objects.create(space=instance, **product_data)
-                    processed_ids.add(new_product.id)
-                    
-            # Set remaining products to inactive (Soft Delete)
-            for p_id, product in current_products_by_id.items():
-                if p_id not in processed_ids:
-                    product.is_active = False
-                    product.save()
-
-        # Handle images (Add only)
+            if rules_data is not None and self._sync_rules(instance, rules_data):
+                invalidate_availability(instance.pk)
+            if products_data is not None:
+                self._sync_products(instance, products_data)
+            self._add_images(instance)
+        return instance
+
+    def _sync_rules(self, space, rules_data):
+        """
+        Make the space's rules equal to rules_data: identical rules are kept,
+        other existing rows are rewritten in place, then the surplus is inserted
+        or deleted. Returns whether anything changed.
+        """
+        wanted = [(r['day_of_week'], r['start_time'], r['end_time']) for r in rules_data]
+        stale = []
+        for rule in space.availability_rules.all():
+            key = (rule.day_of_week, rule.start_time, rule.end_time)
+            if key in wanted:
+                wanted.remove(key)
+            else:
+                stale.append(rule)
+
+        reused = stale[:len(wanted)]
+        for rule, (day, start, end) in zip(reused, wanted):
+            rule.day_of_week, rule.start_time, rule.end_time = day, start, end
+        if reused:
+            AvailabilityRule.objects.bulk_update(reused, ['day_of_week', 'start_time', 'end_time'])
+        AvailabilityRule.objects.bulk_create([
+            AvailabilityRule(space=space, day_of_week=day, start_time=start, end_time=end)
+            for day, start, end in wanted[len(reused):]
+        ])
+        surplus = [rule.pk for rule in stale[len(wanted):]]
+        if surplus:
+            # Like bulk_update/bulk_create, a queryset delete skips the rule signal
+            # handler; the caller invalidates the compiled availability once
+            AvailabilityRule.objects.filter(pk__in=surplus).delete()
+        return bool(stale or wanted)
+
+    def _sync_products(self, space, products_data):
+        """
+        Match payload products to existing ones by id, then by type; update the
+        matches, create the rest and soft-delete products missing from the payload.
+        """
+        current = list(space.products.all())
+        by_id = {p.id: p for p in current}
+        by_type = {p.type: p for p in current}
+
+        changed, created, processed_ids = [], [], set()
+        for product_data in products_data:
+            product = by_id.get(product_data.get('id')) or by_type.get(product_data.get('type'))
+            values = {attr: value for attr, value in product_data.items() if attr != 'id'}
+            if product is None:
+                created.append(SpaceProduct(space=space, **values))
+                continue
+            processed_ids.add(product.id)
+            values['is_active'] = True # Ensure active if in payload
+            if any(getattr(product, attr) != value for attr, value in values.items()):
+                for attr, value in values.items():
+                    setattr(product, attr, value)
+                changed.append(product)
+
+        # Set remaining products to inactive (Soft Delete)
+        for product in current:
+            if product.id not in processed_ids and product.is_active:
+                product.is_active = False
+                changed.append(product)
+
+        if changed:
+            SpaceProduct.objects.bulk_update(changed, ['type', 'name', 'price', 'is_active'])
+        SpaceProduct.objects.bulk_create(created)
+
+    def _add_images(self, space):
+        # Images come from request.FILES (multiple files under 'images'), add only
         request = self.context.get('request')
         if request and request.FILES:
-            for image_file in request.FILES.getlist('images'):
-                 SpaceImage.objects.create(space=instance, image=image_file)
-                 
-        return instance
+            images = SpaceImage.objects.bulk_create([
+                SpaceImage(space=space, image=image_file) for image_file in request.FILES.getlist('images')
+            ])
+            # bulk_create sends no post_save, so renditions are scheduled here
+            schedule_renditions(image.pk for image in images)
@@ -0,0 +1,95 @@
+"""
+Keeps data derived from the space catalog in sync with writes.
+
+Refreshes run on commit so they see the final state of nested writes
+(products, rules, images) made in the same transaction.
+"""
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .availability import invalidate_availability
+from .cards import schedule_card_refresh
+from .clusters import refresh_clusters
+from .renditions import schedule_renditions, release_image
+from .search import update_search_vector
+from .suggest import suggestion_index
+from .tiles import refresh_tiles, tile_of
+from .models import Space, SpaceProduct, SpaceImage, AvailabilityRule, SpaceTombstone
+
+
+def _space_grid_points(space_id):
+    return list(Space.objects.filter(pk=space_id).values_list('grid_x', 'grid_y'))
+
+
+def _touch_space(space_id):
+    """Move the space's updated_at so the delta sync feed (sync.py) picks up a nested change."""
+    # update() sends no post_save, so the space's own refreshes don't run again
+    Space.objects.filter(pk=space_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Space)
+def space_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_search_vector(instance.pk)
+    points = [(instance.grid_x, instance.grid_y)]
+    previous = getattr(instance, '_previous_grid', None)
+    if previous:
+        points.append(previous)
+    transaction.on_commit(lambda: refresh_clusters(points))
+    transaction.on_commit(lambda: suggestion_index.space_changed(instance))
+    schedule_card_refresh(instance.pk)
+
+
+@receiver(post_delete, sender=Space)
+def space_deleted(sender, instance, **kwargs):
+    points = [(instance.grid_x, instance.grid_y)]
+    space_id = instance.pk
+    # Written in the deleting transaction, so delta-sync clients cannot miss it
+    SpaceTombstone.objects.create(space_id=space_id)
+    transaction.on_commit(lambda: refresh_clusters(points))
+    transaction.on_commit(lambda: suggestion_index.space_removed(space_id))
+    tiles = [tile_of(instance.lat, instance.lng)]
+    transaction.on_commit(lambda: refresh_tiles(tiles))
+
+
+@receiver(post_save, sender=SpaceProduct)
+@receiver(post_delete, sender=SpaceProduct)
+def product_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    space_id = instance.space_id
+    _touch_space(space_id)
+    # Min hourly price of the space's cells may have changed
+    transaction.on_commit(lambda: refresh_clusters(_space_grid_points(space_id)))
+    schedule_card_refresh(space_id)
+
+
+@receiver(post_save, sender=AvailabilityRule)
+@receiver(post_delete, sender=AvailabilityRule)
+def rule_changed(sender, instance, raw=False, origin=None, **kwargs):
+    # A QuerySet.delete() is a bulk write like update(); its caller refreshes once
+    if raw or isinstance(origin, QuerySet):
+        return
+    # Compiled rules are read by reservation validation; invalidate right away, not on commit
+    invalidate_availability(instance.space_id)
+    _touch_space(instance.space_id)
+    schedule_card_refresh(instance.space_id)
+
+
+@receiver(post_save, sender=SpaceImage)
+@receiver(post_delete, sender=SpaceImage)
+def image_changed(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+    if created:
+        schedule_renditions([instance.pk])
+    elif kwargs['signal'] is post_delete:
+        name, renditions = instance.image.name, instance.renditions
+        # Files are shared between identical uploads; only the last reference removes them
+        transaction.on_commit(lambda: release_image(name, renditions))
+    _touch_space(instance.space_id)
+    # The cover image may have changed
+    schedule_card_refresh(instance.space_id)
@@ -0,0 +1,203 @@
+"""
+Memory-mapped snapshot of the active space cards, shared by all workers.
+
+build_snapshot() writes the active SpaceCard rows into one binary file at
+settings.SPACE_SNAPSHOT_PATH: fixed-width columns for the numbers and, for
+each string column, an offsets table into a UTF-8 blob. Rows are sorted by
+space id, the key of the cards listing, so a page is a bisect plus a slice.
+
+Every worker mmaps the file read-only; the pages live once in the page
+cache however many workers there are, and only the rows of the page being
+served become Python objects. The builder writes a new file and swaps it in
+with os.replace(); readers notice the new inode on their next stat (at most
+every CHECK_INTERVAL seconds) and map it, while requests in flight keep
+using the old mapping. Run 'manage.py build_space_snapshot' periodically.
+
+The file is host-local and uses native byte order.
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from django.conf import settings
+from .models import SpaceCard
+
+MAGIC = b'RMSNAP02'
+STRING_COLUMNS = ('title', 'address', 'cover_image', 'cover_thumbnail')
+# magic, built_at (ms since epoch), row count, byte length of each string blob
+HEADER = struct.Struct('=8sqI' + 'I' * len(STRING_COLUMNS))
+NULL_INT = -1
+FLAG_AUTO_APPROVAL = 1
+CHECK_INTERVAL = 1.0
+# Older snapshots are ignored and requests fall back to the database
+MAX_AGE = 600
+
+
+def _layout(count, blob_sizes):
+    """[(name, typecode, offset, length)] of every section after the header."""
+    sections = [
+        ('lat', 'd', count), ('lng', 'd', count), ('next_free_at', 'q', count),
+        ('id', 'i', count), ('hourly_price', 'i', count), ('day_pass_price', 'i', count),
+    ]
+    sections += [(f'{name}_offsets', 'I', count + 1) for name in STRING_COLUMNS]
+    sections += [('flags', 'B', count)]
+    sections += [(f'{name}_blob', 'B', size) for name, size in zip(STRING_COLUMNS, blob_sizes)]
+
+    layout, offset = [], HEADER.size
+    for name, typecode, length in sections:
+        size = array(typecode).itemsize
+        offset += -offset % size  # align
+        layout.append((name, typecode, offset, length))
+        offset += size * length
+    return layout
+
+
+def write_snapshot(path, cards):
+    """Write cards, sorted by space id, to a new snapshot file and swap it in."""
+    columns = {name: array(typecode) for name, typecode in (
+        ('lat', 'd'), ('lng', 'd'), ('next_free_at', 'q'),
+        ('id', 'i'), ('hourly_price', 'i'), ('day_pass_price', 'i'), ('flags', 'B'),
+    )}
+    strings = {name: (array('I', [0]), bytearray()) for name in STRING_COLUMNS}
+
+    for card in cards:
+        columns['id'].append(card.space_id)
+        columns['lat'].append(float(card.lat))
+        columns['lng'].append(float(card.lng))
+        columns['next_free_at'].append(int(card.next_free_at.timestamp()) if card.next_free_at else NULL_INT)
+        columns['hourly_price'].append(NULL_INT if card.hourly_price is None else card.hourly_price)
+        columns['day_pass_price'].append(NULL_INT if card.day_pass_price is None else card.day_pass_price)
+        columns['flags'].append(FLAG_AUTO_APPROVAL if card.is_auto_approval else 0)
+        for name in STRING_COLUMNS:
+            offsets, blob = strings[name]
+            blob += str(getattr(card, name) or '').encode('utf-8')
+            offsets.append(len(blob))
+
+    count = len(columns['id'])
+    blob_sizes = [len(strings[name][1]) for name in STRING_COLUMNS]
+    sections = dict(columns)
+    for name in STRING_COLUMNS:
+        sections[f'{name}_offsets'], sections[f'{name}_blob'] = strings[name]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Concurrent rebuilds (even from threads of one process) each get their own temporary file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, int(time.time() * 1000), count, *blob_sizes))
+            for name, typecode, offset, length in _layout(count, blob_sizes):
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(bytes(sections[name]))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def build_snapshot(path=None):
+    """Snapshot the active cards. Returns the row count."""
+    cards = SpaceCard.objects.filter(is_active=True).order_by('space_id').iterator()
+    return write_snapshot(path or settings.SPACE_SNAPSHOT_PATH, cards)
+
+
+class SpaceSnapshot:
+    """Read-only view over a mapped snapshot file."""
+
+    def __init__(self, fileobj):
+        self._map = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        magic, built_at, self.count, *blob_sizes = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('Not a space snapshot.')
+        self.version = built_at
+        self.built_at = built_at / 1000
+        for name, typecode, offset, length in _layout(self.count, blob_sizes):
+            size = array(typecode).itemsize
+            section = view[offset:offset + size * length]
+            setattr(self, name, section if typecode == 'B' else section.cast(typecode))
+
+    def _string(self, name, index):
+        offsets = getattr(self, f'{name}_offsets')
+        return bytes(getattr(self, f'{name}_blob')[offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+    def _nullable(self, column, index):
+        value = column[index]
+        return None if value == NULL_INT else value
+
+    def card(self, index):
+        """Unsaved SpaceCard of row `index`, for SpaceCardSerializer."""
+        next_free_at = self.next_free_at[index]
+        return SpaceCard(
+            space_id=self.id[index],
+            title=self._string('title', index),
+            address=self._string('address', index),
+            lat=Decimal(f'{self.lat[index]:.6f}'),
+            lng=Decimal(f'{self.lng[index]:.6f}'),
+            is_auto_approval=bool(self.flags[index] & FLAG_AUTO_APPROVAL),
+            cover_image=self._string('cover_image', index),
+            cover_thumbnail=self._string('cover_thumbnail', index),
+            hourly_price=self._nullable(self.hourly_price, index),
+            day_pass_price=self._nullable(self.day_pass_price, index),
+            next_free_at=(
+                datetime.fromtimestamp(next_free_at, tz=dt_timezone.utc) if next_free_at != NULL_INT else None
+            ),
+        )
+
+    def page_before(self, space_id, size):
+        """
+        Up to `size` cards with ids below space_id (all ids if None), highest
+        first, plus whether more rows follow.
+        """
+        end = self.count if space_id is None else bisect_left(self.id, space_id)
+        start = max(0, end - size)
+        return [self.card(index) for index in range(end - 1, start - 1, -1)], start > 0
+
+
+class SnapshotReader:
+    """Per-process handle that maps the current snapshot file and follows swaps."""
+
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._inode = None
+        self._checked_at = 0.0
+
+    @property
+    def path(self):
+        return self._path or settings.SPACE_SNAPSHOT_PATH
+
+    def _reload(self):
+        try:
+            if os.stat(self.path).st_ino == self._inode:
+                return
+            with open(self.path, 'rb') as f:
+                # The previous mapping is released once no request uses it
+                self._snapshot, self._inode = SpaceSnapshot(f), os.fstat(f.fileno()).st_ino
+        except (OSError, ValueError, struct.error):
+            self._snapshot, self._inode = None, None
+
+    def current(self):
+        """The latest snapshot, or None if there is none or it is too old."""
+        now = time.monotonic()
+        if now - self._checked_at > CHECK_INTERVAL:
+            with self._lock:
+                if now - self._checked_at > CHECK_INTERVAL:
+                    self._reload()
+                    self._checked_at = now
+        snapshot = self._snapshot
+        if snapshot is None or time.time() - snapshot.built_at > MAX_AGE:
+            return None
+        return snapshot
+
+
+space_snapshot = SnapshotReader()
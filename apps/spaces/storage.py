@@ -0,0 +1,78 @@
+"""
+Content-addressed file storage for space images.
+
+A file is stored under the SHA-256 of its bytes, e.g.
+spaces/3f/a2/3fa2...c9.jpg, whatever name the client sent. Uploading the same
+photo again reuses the stored file, and since a name can never point to
+different bytes, nginx serves these paths with Cache-Control: immutable.
+
+Files are shared between SpaceImage rows, so they are only removed when the
+last row referencing them is deleted (see renditions.release_image).
+"""
+import hashlib
+import os
+import tempfile
+import time
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, digest):
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest[2:4], f'{digest}{ext}')
+
+    def get_available_name(self, name, max_length=None):
+        # Names are chosen in _save() from the content; existing files are reused, not renamed
+        return name
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content_hash(content))
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            # Mark as recently used so a concurrent release of the last reference keeps it
+            os.utime(full_path)
+            return name
+
+        directory = os.path.dirname(full_path)
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        # Concurrent uploads of the same bytes may race here; each writes a
+        # complete temporary file and renames it, so readers never see a partial one.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+    def recently_used(self, name, grace_seconds):
+        try:
+            return time.time() - os.path.getmtime(self.path(name)) < grace_seconds
+        except OSError:
+            return False
+
+
+space_image_storage = ContentAddressedStorage()
@@ -0,0 +1,163 @@
+"""
+In-process prefix index for search box suggestions.
+
+Each worker keeps a sorted array of normalized keys built from active
+spaces' titles and addresses; a lookup is a bisect plus a short scan, so
+keystroke traffic never touches Postgres. Every word of a title/address
+starts a key, so "강남" completes "서울 강남구 ...".
+
+The index follows catalog changes incrementally: writes made by this
+process are applied on commit (see signals.py), and changes made by other
+workers are picked up by a background delta sync on updated_at at most
+every SYNC_INTERVAL seconds. Hard deletes in other workers are read from
+SpaceTombstone by the same sync.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+from .models import Space, SpaceTombstone
+
+SYNC_INTERVAL = 30
+FULL_REBUILD_INTERVAL = 600
+# Rows committed slightly out of updated_at order are re-read on the next sync
+SYNC_OVERLAP = timedelta(seconds=5)
+MAX_SUGGESTIONS = 20
+
+
+def normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+def _keys(text):
+    words = normalize(text).split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._entries = []  # sorted (key, space_id, kind, text)
+        self._by_space = {}  # space_id -> entries, for removal
+
+    def __len__(self):
+        return len(self._by_space)
+
+    def upsert(self, space_id, title, address):
+        self.remove(space_id)
+        entries = []
+        for kind, text in (('title', title), ('address', address)):
+            for key in _keys(text or ''):
+                entry = (key, space_id, kind, text)
+                insort(self._entries, entry)
+                entries.append(entry)
+        self._by_space[space_id] = entries
+
+    def remove(self, space_id):
+        for entry in self._by_space.pop(space_id, ()):
+            index = bisect_left(self._entries, entry)
+            if index < len(self._entries) and self._entries[index] == entry:
+                del self._entries[index]
+
+    def suggest(self, prefix, limit=8):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        index = bisect_left(self._entries, (prefix,))
+        while index < len(self._entries) and len(results) < limit:
+            key, space_id, kind, text = self._entries[index]
+            if not key.startswith(prefix):
+                break
+            if (kind, text) not in seen:
+                seen.add((kind, text))
+                results.append({'text': text, 'kind': kind, 'space_id': space_id})
+            index += 1
+        return results
+
+
+class SuggestionIndex:
+    """The process-wide index plus its synchronization state."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held while building from scratch, so a cold worker scans the catalog once
+        self._build_lock = threading.Lock()
+        self._index = None
+        self._watermark = None
+        self._deleted_watermark = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._syncing = False
+
+    def _rows(self, **filters):
+        return Space.objects.filter(**filters).values_list('id', 'title', 'address', 'is_active', 'updated_at')
+
+    def _build(self):
+        # Spaces deleted from here on are missing from the scan or removed by the next sync
+        deleted_watermark = timezone.now()
+        index, watermark = PrefixIndex(), None
+        for space_id, title, address, is_active, updated_at in self._rows(is_active=True).iterator():
+            index.upsert(space_id, title, address)
+            watermark = max(watermark, updated_at) if watermark else updated_at
+        now = time.monotonic()
+        with self._lock:
+            self._index, self._watermark, self._deleted_watermark = index, watermark, deleted_watermark
+            self._synced_at = self._built_at = now
+
+    def _sync(self):
+        try:
+            if time.monotonic() - self._built_at > FULL_REBUILD_INTERVAL or self._watermark is None:
+                self._build()
+                return
+            rows = list(self._rows(updated_at__gte=self._watermark - SYNC_OVERLAP))
+            tombstones = list(
+                SpaceTombstone.objects.filter(deleted_at__gte=self._deleted_watermark - SYNC_OVERLAP)
+                .values_list('space_id', 'deleted_at')
+            )
+            with self._lock:
+                for space_id, title, address, is_active, updated_at in rows:
+                    if is_active:
+                        self._index.upsert(space_id, title, address)
+                    else:
+                        self._index.remove(space_id)
+                    self._watermark = max(self._watermark, updated_at)
+                for space_id, deleted_at in tombstones:
+                    self._index.remove(space_id)
+                    self._deleted_watermark = max(self._deleted_watermark, deleted_at)
+                self._synced_at = time.monotonic()
+        finally:
+            self._syncing = False
+            connection.close()
+
+    def suggest(self, prefix, limit=8):
+        if self._index is None:
+            # First use in this worker: build synchronously, once for all waiting threads
+            with self._build_lock:
+                if self._index is None:
+                    self._build()
+        with self._lock:
+            if time.monotonic() - self._synced_at > SYNC_INTERVAL and not self._syncing:
+                # Serve from the current index and refresh it in the background
+                self._syncing = True
+                threading.Thread(target=self._sync, daemon=True).start()
+            return self._index.suggest(prefix, limit)
+
+    def space_changed(self, space):
+        if self._index is None:
+            return
+        with self._lock:
+            if space.is_active:
+                self._index.upsert(space.pk, space.title, space.address)
+            else:
+                self._index.remove(space.pk)
+
+    def space_removed(self, space_id):
+        if self._index is None:
+            return
+        with self._lock:
+            self._index.remove(space_id)
+
+
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,79 @@
+"""
+Delta sync of the space catalog.
+
+Clients keep a local copy of the active spaces and poll with the opaque
+cursor of their previous response. The cursor holds two keyset positions:
+(updated_at, id) over spaces and (deleted_at, id) over SpaceTombstone, so
+each poll is two index range scans whatever the size of the catalog.
+
+Spaces updated since the cursor come back in 'changed' when active and in
+'deleted' when deactivated; hard deletes come from tombstones. Edits of a
+space's products, rules and images move its updated_at too (signals.py).
+A row only enters the feed once it is SETTLE_LAG old: updated_at is stamped
+before commit, so a younger row could still be followed by a concurrent
+transaction committing an earlier timestamp.
+"""
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from common.pagination import decode_cursor, encode_cursor, keyset_filter
+from .models import Space, SpaceTombstone
+
+SETTLE_LAG = timedelta(seconds=10)
+SPACE_ORDERING = ['updated_at', 'id']
+TOMBSTONE_ORDERING = ['deleted_at', 'id']
+
+
+def parse_changes_cursor(cursor):
+    """(space position, tombstone position) of a cursor; a position is None before the first row."""
+    values = decode_cursor(cursor)
+    if len(values) != 4:
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+    space_position, tombstone_position = values[:2], values[2:]
+    return (
+        space_position if space_position[0] is not None else None,
+        tombstone_position if tombstone_position[0] is not None else None,
+    )
+
+
+def _after(queryset, ordering, position):
+    if position is not None:
+        queryset = queryset.filter(keyset_filter(ordering, position))
+    return queryset.order_by(*ordering)
+
+
+def changes_since(cursor, limit):
+    """
+    Spaces changed after `cursor`, at most `limit` of each kind.
+
+    Returns (changed, deleted_ids, next_cursor, has_more) where changed is a
+    list of active Space instances.
+    """
+    settled = timezone.now() - SETTLE_LAG
+    spaces = Space.objects.filter(updated_at__lte=settled)
+    if cursor:
+        space_position, tombstone_position = parse_changes_cursor(cursor)
+    else:
+        # Full sync: the client has nothing to delete yet
+        spaces = spaces.filter(is_active=True)
+        space_position, tombstone_position = None, [settled, 0]
+    spaces = list(
+        _after(spaces, SPACE_ORDERING, space_position)
+        .prefetch_related('images', 'products', 'availability_rules')[:limit + 1]
+    )
+    tombstones = list(
+        _after(SpaceTombstone.objects.filter(deleted_at__lte=settled), TOMBSTONE_ORDERING, tombstone_position)
+        .values_list('deleted_at', 'id', 'space_id')[:limit + 1]
+    )
+    has_more = len(spaces) > limit or len(tombstones) > limit
+    spaces, tombstones = spaces[:limit], tombstones[:limit]
+
+    if spaces:
+        space_position = [spaces[-1].updated_at, spaces[-1].pk]
+    if tombstones:
+        tombstone_position = list(tombstones[-1][:2])
+    next_cursor = encode_cursor((space_position or [None, 0]) + (tombstone_position or [None, 0]))
+
+    changed = [space for space in spaces if space.is_active]
+    deleted = [space.pk for space in spaces if not space.is_active] + [t[2] for t in tombstones]
+    return changed, deleted, next_cursor, has_more
@@ -0,0 +1,140 @@
+"""
+Static GeoJSON tiles of the active catalog.
+
+Active space cards are written as one FeatureCollection per Web Mercator
+tile of zoom TILE_ZOOM under MEDIA_ROOT/tiles/spaces/{z}/{x}/{y}.geojson, so
+map clients zoomed in past the cluster levels fetch them straight from
+nginx. A missing tile means no space in it.
+
+Tiles are rewritten from refresh_cards() for the tiles the refreshed cards
+were and are in, and a file is only replaced when its content changed, so
+the periodic card refresh leaves unchanged tiles (and their ETags) alone.
+Writes go through a temporary file and os.replace(), so nginx never serves a
+partial tile. 'manage.py build_space_tiles' rebuilds every tile and removes
+stale ones.
+"""
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from .geo import GRID_BITS, grid_xy
+from .models import SpaceCard
+
+TILE_ZOOM = 12
+TILE_SHIFT = GRID_BITS - TILE_ZOOM
+TILE_SUFFIX = '.geojson'
+
+
+def tiles_root():
+    return os.path.join(settings.MEDIA_ROOT, 'tiles', 'spaces', str(TILE_ZOOM))
+
+
+def tile_path(tile):
+    x, y = tile
+    return os.path.join(tiles_root(), str(x), f'{y}{TILE_SUFFIX}')
+
+
+def tile_of(lat, lng):
+    x, y = grid_xy(lat, lng)
+    return x >> TILE_SHIFT, y >> TILE_SHIFT
+
+
+def _feature(card):
+    return {
+        'type': 'Feature',
+        'id': card.space_id,
+        'geometry': {'type': 'Point', 'coordinates': [float(card.lng), float(card.lat)]},
+        'properties': {
+            'title': card.title,
+            'address': card.address,
+            'is_auto_approval': card.is_auto_approval,
+            'cover_image': default_storage.url(card.cover_image.name) if card.cover_image else None,
+            'cover_thumbnail': default_storage.url(card.cover_thumbnail.name) if card.cover_thumbnail else None,
+            'hourly_price': card.hourly_price,
+            'day_pass_price': card.day_pass_price,
+        },
+    }
+
+
+def _tile_cards(tiles=None):
+    """{tile: [cards]} of active cards, restricted to `tiles` when given."""
+    queryset = SpaceCard.objects.filter(is_active=True).annotate(
+        grid_x=F('space__grid_x'), grid_y=F('space__grid_y'),
+    )
+    if tiles is not None:
+        in_tiles = Q()
+        for x, y in tiles:
+            in_tiles |= Q(
+                space__grid_x__gte=x << TILE_SHIFT, space__grid_x__lt=(x + 1) << TILE_SHIFT,
+                space__grid_y__gte=y << TILE_SHIFT, space__grid_y__lt=(y + 1) << TILE_SHIFT,
+            )
+        queryset = queryset.filter(in_tiles)
+    grouped = {}
+    for card in queryset.order_by('space_id').iterator():
+        grouped.setdefault((card.grid_x >> TILE_SHIFT, card.grid_y >> TILE_SHIFT), []).append(card)
+    return grouped
+
+
+def _write_tile(tile, cards):
+    """Write or remove one tile; returns whether the file changed."""
+    path = tile_path(tile)
+    if not cards:
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+    content = json.dumps(
+        {'type': 'FeatureCollection', 'features': [_feature(card) for card in cards]},
+        ensure_ascii=False, separators=(',', ':'),
+    ).encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # A unique name per writer: two threads of one process may rebuild the same file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def refresh_tiles(tiles):
+    """Rewrite the given tiles from the current cards. One query for all of them."""
+    tiles = set(tiles)
+    if not tiles:
+        return 0
+    grouped = _tile_cards(tiles)
+    return sum(_write_tile(tile, grouped.get(tile, [])) for tile in tiles)
+
+
+def rebuild_tiles():
+    """Write every tile and remove the files of tiles that became empty."""
+    grouped = _tile_cards()
+    changed = sum(_write_tile(tile, cards) for tile, cards in grouped.items())
+
+    root = tiles_root()
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith(TILE_SUFFIX):
+                continue
+            try:
+                tile = (int(os.path.basename(dirpath)), int(filename[:-len(TILE_SUFFIX)]))
+            except ValueError:
+                continue
+            if tile not in grouped:
+                os.remove(os.path.join(dirpath, filename))
+                changed += 1
+    return len(grouped), changed
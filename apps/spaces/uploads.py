@@ -0,0 +1,311 @@
+"""
+Direct image uploads that bypass the application workers.
+
+1. The host asks for a presigned upload (presign_upload) and gets a URL to
+   PUT the file to, valid for SPACE_UPLOAD_URL_TTL seconds.
+2. The client PUTs the bytes straight to the object store.
+3. The host confirms (confirm_upload): the object is checked to be an image
+   within SPACE_UPLOAD_MAX_BYTES and becomes a SpaceImage.
+
+Alternatively, clients on flaky connections use a resumable upload session:
+create one (create_session), PUT numbered chunks of session.chunk_size
+bytes (write_chunk) in order, resuming from next_chunk after a failure, and
+finalize (finalize_session). Chunks are streamed to a file on disk, so
+worker memory stays flat whatever the file size.
+
+SPACE_UPLOAD_STORE selects the object store: 's3' presigns S3 (or any S3
+compatible endpoint) PUTs through boto3, which is only needed in that mode;
+'local' is a stand-in for development and tests that keeps pending objects
+under MEDIA_ROOT/uploads/ and accepts PUTs on a signed Django URL.
+"""
+import os
+import tempfile
+import uuid
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.db import transaction
+from django.urls import reverse
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from .models import SpaceImage, UploadSession
+
+CONTENT_TYPES = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp'}
+CHUNK_SIZE = 64 * 1024
+SIGNING_SALT = 'spaces.upload'
+SESSION_CHUNK_SIZE = 1024 * 1024
+
+
+def copy_stream(stream, f, length):
+    """Copy exactly `length` bytes from stream to f, CHUNK_SIZE at a time."""
+    remaining = length
+    while remaining > 0:
+        chunk = stream.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise ValueError('Upload ended early.')
+        f.write(chunk)
+        remaining -= len(chunk)
+
+
+class LocalObjectStore:
+    """Filesystem stand-in for an object store with presigned PUT URLs."""
+
+    def root(self):
+        return os.path.join(settings.MEDIA_ROOT, 'uploads')
+
+    def path(self, key):
+        path = os.path.normpath(os.path.join(self.root(), key))
+        if not path.startswith(self.root() + os.sep):
+            raise ValueError('Invalid key.')
+        return path
+
+    def presign_put(self, key, content_type, max_bytes, expires_in, request=None):
+        token = signing.TimestampSigner(salt=SIGNING_SALT).sign_object(
+            {'key': key, 'content_type': content_type, 'max_bytes': max_bytes},
+        )
+        url = reverse('space-upload-put', kwargs={'token': token})
+        return {
+            'url': request.build_absolute_uri(url) if request else url,
+            'method': 'PUT',
+            'headers': {'Content-Type': content_type},
+        }
+
+    def verify_put(self, token, expires_in):
+        """The signed upload a token allows, or None if invalid or expired."""
+        try:
+            return signing.TimestampSigner(salt=SIGNING_SALT).unsign_object(token, max_age=expires_in)
+        except signing.BadSignature:
+            return None
+
+    def write(self, key, stream, length):
+        """Store `length` bytes read from stream in chunks, replacing the object atomically."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                copy_stream(stream, f, length)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def size(self, key):
+        try:
+            return os.path.getsize(self.path(key))
+        except OSError:
+            return None
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3ObjectStore:
+    """Presigned uploads to an S3 bucket (boto3 is imported lazily)."""
+
+    def __init__(self):
+        try:
+            import boto3
+        except ImportError:
+            raise ImproperlyConfigured("SPACE_UPLOAD_STORE='s3' requires boto3.")
+        if not settings.SPACE_UPLOAD_BUCKET:
+            raise ImproperlyConfigured("SPACE_UPLOAD_STORE='s3' requires SPACE_UPLOAD_BUCKET.")
+        self.bucket = settings.SPACE_UPLOAD_BUCKET
+        self.client = boto3.client('s3', endpoint_url=settings.SPACE_UPLOAD_ENDPOINT_URL)
+
+    def presign_put(self, key, content_type, max_bytes, expires_in, request=None):
+        url = self.client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': self.bucket, 'Key': key, 'ContentType': content_type},
+            ExpiresIn=expires_in,
+        )
+        return {'url': url, 'method': 'PUT', 'headers': {'Content-Type': content_type}}
+
+    def size(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)['ContentLength']
+        except self.client.exceptions.ClientError:
+            return None
+
+    def open(self, key):
+        # Spooled to disk past 1 MB, so large objects do not sit in worker memory
+        f = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        self.client.download_fileobj(self.bucket, key, f)
+        f.seek(0)
+        return f
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+_stores = {}
+
+
+def get_object_store():
+    kind = settings.SPACE_UPLOAD_STORE
+    if kind not in _stores:
+        if kind == 'local':
+            _stores[kind] = LocalObjectStore()
+        elif kind == 's3':
+            _stores[kind] = S3ObjectStore()
+        else:
+            raise ImproperlyConfigured(f'Unknown SPACE_UPLOAD_STORE {kind!r}.')
+    return _stores[kind]
+
+
+def _pending_prefix(space):
+    return f'pending/{space.pk}/'
+
+
+def _check_upload(content_type, size):
+    if content_type not in CONTENT_TYPES:
+        raise ValidationError({'content_type': f'Must be one of {", ".join(CONTENT_TYPES)}.'})
+    if size > settings.SPACE_UPLOAD_MAX_BYTES:
+        raise ValidationError({'size': f'Must be at most {settings.SPACE_UPLOAD_MAX_BYTES} bytes.'})
+
+
+def presign_upload(space, content_type, size, request=None):
+    _check_upload(content_type, size)
+
+    key = f'{_pending_prefix(space)}{uuid.uuid4().hex}{CONTENT_TYPES[content_type]}'
+    upload = get_object_store().presign_put(
+        key, content_type, settings.SPACE_UPLOAD_MAX_BYTES, settings.SPACE_UPLOAD_URL_TTL, request=request,
+    )
+    return {'key': key, 'expires_in': settings.SPACE_UPLOAD_URL_TTL, **upload}
+
+
+def attach_image(space, fileobj, name):
+    """Check that fileobj is an image and store it as a SpaceImage of space."""
+    try:
+        with Image.open(fileobj) as image:
+            image.verify()
+    except Exception:
+        raise ValidationError({'file': 'Not a valid image.'})
+    fileobj.seek(0)
+    return SpaceImage.objects.create(space=space, image=File(fileobj, name=name))
+
+
+def confirm_upload(space, key):
+    """Turn an uploaded object into a SpaceImage of space and remove the pending object."""
+    store = get_object_store()
+    if not key.startswith(_pending_prefix(space)) or '..' in key:
+        raise ValidationError({'key': 'Unknown upload.'})
+    size = store.size(key)
+    if size is None:
+        raise ValidationError({'key': 'Nothing was uploaded for this key.'})
+    if size > settings.SPACE_UPLOAD_MAX_BYTES:
+        store.delete(key)
+        raise ValidationError({'key': 'Upload is too large.'})
+
+    with store.open(key) as f:
+        image = attach_image(space, f, os.path.basename(key))
+    store.delete(key)
+    return image
+
+
+def session_path(session):
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', 'sessions', f'{session.pk}.part')
+
+
+def create_session(space, user, filename, content_type, size):
+    _check_upload(content_type, size)
+    session = UploadSession.objects.create(
+        space=space, created_by=user, filename=os.path.basename(filename), content_type=content_type,
+        size=size, chunk_size=SESSION_CHUNK_SIZE,
+    )
+    path = session_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return session
+
+
+class ChunkConflict(Exception):
+    """A chunk was sent out of order; the client should resume from session.next_chunk."""
+
+
+def _lock_for_chunk(session_id, index, length):
+    """
+    Lock a session row and check that chunk `index` of `length` bytes can be
+    written. Returns (session, False) for an already received chunk and
+    (session, True) for the next one. Must run inside a transaction.
+    """
+    session = UploadSession.objects.select_for_update().get(pk=session_id)
+    if session.status != UploadSession.Status.OPEN:
+        raise ValidationError({'status': 'Upload session is closed.'})
+    if index >= session.chunk_count:
+        raise ValidationError({'index': f'Must be below {session.chunk_count}.'})
+    if index < session.next_chunk:
+        return session, False
+    if index > session.next_chunk:
+        raise ChunkConflict(session)
+
+    expected = min(session.chunk_size, session.size - session.received)
+    if length != expected:
+        raise ValidationError({'length': f'Chunk {index} must be {expected} bytes.'})
+    return session, True
+
+
+def write_chunk(session_id, index, stream, length):
+    """
+    Append chunk `index` of a session from stream. Re-sending an already
+    received chunk is a no-op, so clients can retry blindly.
+
+    The session row is only locked to check the chunk and, once its bytes are
+    in a temporary file, to append them; a slow client never holds the lock.
+    Concurrent retries of one chunk each stream their own copy and the first
+    to append wins.
+    """
+    with transaction.atomic():
+        session, needed = _lock_for_chunk(session_id, index, length)
+    if not needed:
+        return session
+
+    path = session_path(session)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.chunk')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            copy_stream(stream, tmp, length)
+        with transaction.atomic():
+            session, needed = _lock_for_chunk(session_id, index, length)
+            if needed:
+                with open(path, 'r+b') as f, open(tmp_path, 'rb') as tmp:
+                    # Drop the tail of an earlier append that failed midway
+                    f.truncate(session.received)
+                    f.seek(session.received)
+                    copy_stream(tmp, f, length)
+                session.received += length
+                session.save(update_fields=['received', 'updated_at'])
+    finally:
+        os.remove(tmp_path)
+    return session
+
+
+def finalize_session(session_id):
+    """Turn a fully received session into a SpaceImage and drop its file."""
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().select_related('space').get(pk=session_id)
+        if session.status == UploadSession.Status.COMPLETED:
+            return session
+        if session.received != session.size:
+            raise ValidationError({'received': f'{session.received} of {session.size} bytes received.'})
+        name = os.path.splitext(session.filename)[0] + CONTENT_TYPES[session.content_type]
+        with open(session_path(session), 'rb') as f:
+            session.image = attach_image(session.space, f, name)
+        session.status = UploadSession.Status.COMPLETED
+        session.save(update_fields=['image', 'status', 'updated_at'])
+    remove_session_file(session)
+    return session
+
+
+def remove_session_file(session):
+    try:
+        os.remove(session_path(session))
+    except FileNotFoundError:
+        pass
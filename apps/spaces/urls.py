@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers # Need to add drf-nested-routers to requirements
-from .views import SpaceViewSet, AvailabilityRuleViewSet, SpaceProductViewSet, SpaceImageViewSet
+from .views import local_upload_put, SpaceViewSet, AvailabilityRuleViewSet, SpaceProductViewSet, SpaceImageViewSet, SpaceCalendarViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
 router.register(r'spaces', SpaceViewSet, basename='space')
@@ -10,8 +10,12 @@ spaces_router = routers.NestedSimpleRouter(router, r'spaces', lookup='space')
 spaces_router.register(r'availability-rules', AvailabilityRuleViewSet, basename='space-availability-rules')
 spaces_router.register(r'products', SpaceProductViewSet, basename='space-products')
 spaces_router.register(r'images', SpaceImageViewSet, basename='space-images')
+spaces_router.register(r'calendar', SpaceCalendarViewSet, basename='space-calendar')
+spaces_router.register(r'upload-sessions', UploadSessionViewSet, basename='space-upload-sessions')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('', include(spaces_router.urls)),
+    # Presigned PUT target of the local upload store (see uploads.py)
+    path('uploads/<str:token>/', local_upload_put, name='space-upload-put'),
 ]
@@ -1,9 +1,27 @@
-from rest_framework import viewsets, permissions, status
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from django.utils import timezone
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from common.permissions import IsHost
-from .models import Space, AvailabilityRule, SpaceProduct, SpaceImage
-from .serializers import SpaceSerializer, AvailabilityRuleSerializer, SpaceProductSerializer, SpaceImageSerializer
+from common.pagination import KeysetPagination, decode_cursor, encode_cursor
+from .geo import parse_geo_params, parse_bbox, filter_geo
+from .clusters import clusters_in_viewport
+from .search import available_spaces, filter_text
+from .suggest import suggestion_index, MAX_SUGGESTIONS
+from .sync import changes_since
+from .snapshot import space_snapshot
+from .bulk import set_active, reprice
+from .uploads import presign_upload, confirm_upload, get_object_store, LocalObjectStore, create_session, write_chunk, finalize_session, ChunkConflict
+from .importer import import_spaces, read_records, guess_format, FORMATS
+from .availability import slot_calendar, SLOT_MINUTES
+from .models import Space, AvailabilityRule, SpaceProduct, SpaceImage, SpaceCard, UploadSession
+from .serializers import SpaceSerializer, AvailabilityRuleSerializer, SpaceProductSerializer, SpaceImageSerializer, SpaceClusterSerializer, AvailableSearchSerializer, SlotCalendarQuerySerializer, SlotCalendarDaySerializer, SpaceCardSerializer, BulkSpaceSelectionSerializer, BulkRepriceSerializer, PresignUploadSerializer, ConfirmUploadSerializer, UploadSessionSerializer
 
 class IsSpaceOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -16,7 +34,7 @@ class SpaceViewSet(viewsets.ModelViewSet):
     serializer_class = SpaceSerializer
     
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy', 'deactivate']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'deactivate', 'bulk_import', 'bulk_activate', 'bulk_deactivate', 'bulk_reprice']:
             return [permissions.IsAuthenticated(), IsHost(), IsSpaceOwner()]
         return [permissions.AllowAny()]
 
@@ -26,6 +44,33 @@ class SpaceViewSet(viewsets.ModelViewSet):
              return Space.objects.filter(host=self.request.user).order_by('-created_at')
         return Space.objects.filter(is_active=True).order_by('-created_at')
 
+    def list(self, request, *args, **kwargs):
+        """
+        Plain list by default. With q= the list is text-searched and ordered by
+        relevance; with bbox=, lat/lng+radius= or lat/lng+nearest= it is filtered
+        through the spatial index and ordered by distance. Searches are
+        keyset-paginated (or capped at N for nearest).
+        """
+        geo = parse_geo_params(request.query_params)
+        q = request.query_params.get('q', '').strip()
+        if geo is None and not q:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.get_queryset()
+        if q:
+            queryset = filter_text(queryset, q)
+        if geo is not None:
+            queryset = filter_geo(queryset, geo)
+        queryset = queryset.prefetch_related('images', 'products', 'availability_rules')
+        if geo is not None and geo['nearest'] is not None:
+            serializer = self.get_serializer(queryset[:geo['nearest']], many=True)
+            return Response({'next_cursor': None, 'results': serializer.data})
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     def perform_create(self, serializer):
         serializer.save(host=self.request.user)
 
@@ -54,6 +99,176 @@ class SpaceViewSet(viewsets.ModelViewSet):
         )
         active_reservations.update(status=Reservation.Status.CANCELED)
 
+    @action(detail=False, methods=['get'])
+    def cards(self, request):
+        """
+        Slim list/map payload served from the SpaceCard read model: one indexed
+        query per page. Accepts the same geo parameters as list(). Without
+        them, pages come from the shared snapshot when a fresh one exists.
+        """
+        queryset = SpaceCard.objects.filter(is_active=True).order_by('-space_id')
+        geo = parse_geo_params(request.query_params)
+        if geo is None:
+            snapshot = space_snapshot.current()
+            if snapshot is not None:
+                return self._snapshot_cards(request, snapshot)
+        else:
+            queryset = filter_geo(queryset, geo)
+            if geo['nearest'] is not None:
+                serializer = SpaceCardSerializer(queryset[:geo['nearest']], many=True, context={'request': request})
+                return Response({'next_cursor': None, 'results': serializer.data})
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = SpaceCardSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    def _snapshot_cards(self, request, snapshot):
+        # Same ordering and cursor as the database path, so clients can page across both
+        cursor = request.query_params.get('cursor')
+        values = decode_cursor(cursor) if cursor else [None]
+        if len(values) != 1:
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+        cards, has_next = snapshot.page_before(values[0], KeysetPagination().get_page_size(request))
+        serializer = SpaceCardSerializer(cards, many=True, context={'request': request})
+        response = Response({
+            'next_cursor': encode_cursor([cards[-1].space_id]) if has_next else None,
+            'results': serializer.data,
+        })
+        response['X-Snapshot-Version'] = str(snapshot.version)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Delta sync of the catalog: ?cursor=<next_cursor of the previous call>.
+        Without a cursor, returns every active space. Poll again with
+        next_cursor (immediately while has_more is true).
+        """
+        limit = KeysetPagination().get_page_size(request)
+        changed, deleted, next_cursor, has_more = changes_since(request.query_params.get('cursor'), limit)
+        return Response({
+            'changed': SpaceSerializer(changed, many=True, context={'request': request}).data,
+            'deleted': deleted,
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+        })
+
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """Precomputed marker clusters for a map viewport: ?bbox=south,west,north,east&zoom=z"""
+        if 'bbox' not in request.query_params:
+            return Response({'error': 'bbox is required'}, status=status.HTTP_400_BAD_REQUEST)
+        bbox = parse_bbox(request.query_params['bbox'])
+        try:
+            zoom = int(request.query_params.get('zoom', ''))
+        except ValueError:
+            return Response({'error': 'zoom must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        zoom, clusters = clusters_in_viewport(bbox, zoom)
+        return Response({'zoom': zoom, 'clusters': SpaceClusterSerializer(clusters, many=True).data})
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Title/address completions for the search box: ?q=prefix&limit=n (served from memory)."""
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 8)), MAX_SUGGESTIONS))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'suggestions': suggestion_index.suggest(request.query_params.get('q', ''), limit)})
+
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """
+        Spaces near a point that are free for a window, ranked by distance (or
+        price with sort=price). Geo params as in list(), plus start_at/end_at
+        for HOURLY or date for DAY_PASS.
+        """
+        geo = parse_geo_params(request.query_params)
+        if geo is None:
+            return Response({'error': 'bbox or lat/lng is required'}, status=status.HTTP_400_BAD_REQUEST)
+        params = AvailableSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        queryset = available_spaces(
+            geo,
+            params.validated_data['start_at'],
+            params.validated_data['end_at'],
+            params.validated_data['product_type'],
+            sort=params.validated_data['sort'],
+        )
+        if geo['nearest'] is not None:
+            return Response({'next_cursor': None, 'results': list(queryset[:geo['nearest']])})
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(page)
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Create many spaces from an uploaded CSV or NDJSON 'file' (multipart
+        fields: file_format, defaulting to the file name, and dry_run=true to
+        only validate). Returns counts
+        and a per-row error report; valid rows are created even if others fail.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('file_format') or guess_format(upload.name)
+        if fmt not in FORMATS:
+            return Response({'error': f'file_format must be one of {", ".join(FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = request.data.get('dry_run') == 'true'
+        report = import_spaces(request.user, read_records(upload, fmt), dry_run=dry_run)
+        return Response(report, status=status.HTTP_200_OK if dry_run or not report['created'] else status.HTTP_201_CREATED)
+
+    def _bulk_space_ids(self, data):
+        """Ids selected by a validated BulkSpaceSelectionSerializer, all owned by the user."""
+        mine = Space.objects.filter(host=self.request.user)
+        if 'ids' in data:
+            ids = set(data['ids'])
+            owned = set(mine.filter(pk__in=ids).values_list('pk', flat=True))
+            if owned != ids:
+                raise PermissionDenied(f"You do not own spaces {sorted(ids - owned)}.")
+            return sorted(ids)
+
+        filters = data['filter']
+        if 'is_active' in filters:
+            mine = mine.filter(is_active=filters['is_active'])
+        if filters.get('title'):
+            mine = mine.filter(title__icontains=filters['title'])
+        if filters.get('address'):
+            mine = mine.filter(address__icontains=filters['address'])
+        return list(mine.values_list('pk', flat=True))
+
+    def _bulk_set_active(self, request, is_active):
+        params = BulkSpaceSelectionSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        updated, canceled = set_active(self._bulk_space_ids(params.validated_data), is_active)
+        return Response({'updated': updated, 'canceled_reservations': canceled})
+
+    @action(detail=False, methods=['post'], url_path='bulk-deactivate')
+    def bulk_deactivate(self, request):
+        """Deactivate many spaces and cancel their active reservations: {ids: [...]} or {filter: {...}}"""
+        return self._bulk_set_active(request, False)
+
+    @action(detail=False, methods=['post'], url_path='bulk-activate')
+    def bulk_activate(self, request):
+        """Reactivate many spaces: {ids: [...]} or {filter: {...}}"""
+        return self._bulk_set_active(request, True)
+
+    @action(detail=False, methods=['post'], url_path='bulk-reprice')
+    def bulk_reprice(self, request):
+        """Set (price) or change by percent (percent) the active products of one type across many spaces."""
+        params = BulkRepriceSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        updated = reprice(
+            self._bulk_space_ids(data), data['type'], price=data.get('price'), percent=data.get('percent'),
+        )
+        return Response({'updated': updated})
+
     @action(detail=True, methods=['post'])
     def deactivate(self, request, pk=None):
         space = self.get_object()
@@ -100,3 +315,122 @@ class SpaceImageViewSet(BaseNestedViewSet):
         if instance.space.host != self.request.user:
             raise permissions.PermissionDenied("You do not own this space.")
         instance.delete()
+
+    def get_permissions(self):
+        if self.action in ['presign', 'confirm']:
+            return [permissions.IsAuthenticated(), IsHost()]
+        return super().get_permissions()
+
+    def get_owned_space(self):
+        space = get_object_or_404(Space, pk=self.kwargs['space_pk'])
+        if space.host != self.request.user:
+            raise PermissionDenied("You do not own this space.")
+        return space
+
+    @action(detail=False, methods=['post'])
+    def presign(self, request, space_pk=None):
+        """
+        Start a direct upload: {content_type, size} -> {key, url, method, headers}.
+        PUT the file to url, then POST {key} to confirm/.
+        """
+        params = PresignUploadSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        upload = presign_upload(
+            self.get_owned_space(), params.validated_data['content_type'], params.validated_data['size'], request,
+        )
+        return Response(upload, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def confirm(self, request, space_pk=None):
+        """Record a finished direct upload as an image of the space."""
+        params = ConfirmUploadSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        image = confirm_upload(self.get_owned_space(), params.validated_data['key'])
+        return Response(self.get_serializer(image).data, status=status.HTTP_201_CREATED)
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable chunked image upload for a space:
+    POST {filename, content_type, size}; PUT chunks/<n>/ with the raw bytes of
+    chunk n (from 0, chunk_size bytes each but the last); GET to resume from
+    next_chunk; POST finalize/ to attach the image.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated, IsHost]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(space_id=self.kwargs['space_pk'], created_by=self.request.user)
+
+    def create(self, request, space_pk=None):
+        space = get_object_or_404(Space, pk=space_pk)
+        if space.host != request.user:
+            raise PermissionDenied("You do not own this space.")
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = create_session(space, request.user, **serializer.validated_data)
+        return Response(self.get_serializer(session).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, space_pk=None, pk=None, index=None):
+        session = self.get_object()
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        try:
+            # request.stream is the raw body; nothing is parsed or buffered
+            session = write_chunk(session.pk, int(index), request.stream, length)
+        except ChunkConflict:
+            session.refresh_from_db()
+            return Response(self.get_serializer(session).data, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            raise ValidationError({'chunk': str(e)})
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, space_pk=None, pk=None):
+        session = finalize_session(self.get_object().pk)
+        return Response(self.get_serializer(session).data)
+
+@csrf_exempt
+@require_http_methods(['PUT'])
+def local_upload_put(request, token):
+    """
+    PUT target of presigned uploads with the local object store. The signed
+    token is the authorization; the body is streamed to disk in chunks.
+    """
+    store = get_object_store()
+    upload = store.verify_put(token, settings.SPACE_UPLOAD_URL_TTL) if isinstance(store, LocalObjectStore) else None
+    if upload is None:
+        return HttpResponseForbidden('Invalid or expired upload URL.')
+    if request.content_type != upload['content_type']:
+        return HttpResponseBadRequest('Content-Type does not match the presigned upload.')
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length <= 0:
+        return HttpResponse('Content-Length is required.', status=411)
+    if length > upload['max_bytes']:
+        return HttpResponse('Upload is too large.', status=413)
+    try:
+        store.write(upload['key'], request, length)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    return HttpResponse(status=200)
+
+class SpaceCalendarViewSet(viewsets.ViewSet):
+    """Free/booked half-hour slot bitmaps of a space: ?start=YYYY-MM-DD&days=N"""
+    permission_classes = [permissions.AllowAny]
+
+    def list(self, request, space_pk=None):
+        space = get_object_or_404(Space, pk=space_pk, is_active=True)
+        params = SlotCalendarQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        first_day = params.validated_data.get('start') or timezone.localdate()
+        calendar = slot_calendar(space, first_day, params.validated_data['days'])
+        return Response({
+            'slot_minutes': SLOT_MINUTES,
+            'days': SlotCalendarDaySerializer(calendar, many=True).data,
+        })
@@ -0,0 +1,21 @@
+from django.db import transaction
+
+
+def on_commit_once(key, func, using=None):
+    """
+    Like transaction.on_commit(), but a given key is scheduled at most once per
+    transaction. Use it for refreshes that read their data at commit time, so
+    many writes to the same object in one transaction cost one refresh.
+    """
+    connection = transaction.get_connection(using)
+    pending = connection.__dict__.setdefault('_on_commit_once', {})
+    registered = pending.get(key)
+    if registered is not None and any(f is registered for _, f, _ in connection.run_on_commit):
+        return
+
+    def callback():
+        pending.pop(key, None)
+        func()
+
+    pending[key] = callback
+    transaction.on_commit(callback, using=using)
@@ -0,0 +1,89 @@
+import base64
+import json
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+    if not isinstance(values, list):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+    return values
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the "strictly after this row" filter for a keyset ordering.
+
+    For ordering (a, b, c) this is: a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+    with > flipped to < for descending keys.
+    """
+    condition = Q()
+    equal = {}
+    for key, value in zip(ordering, values):
+        descending = key.startswith('-')
+        name = key.lstrip('-')
+        lookup = 'lt' if descending else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the queryset's own order_by().
+
+    Unlike DRF's CursorPagination the ordering may contain annotations (e.g. a
+    distance or a search rank), as long as the last key is unique (usually 'id').
+    Each page is a single indexed range scan instead of an OFFSET.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            raise ValidationError({self.page_size_query_param: 'Must be an integer.'})
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = [str(key) for key in queryset.query.order_by]
+        if not ordering:
+            raise ValueError('KeysetPagination requires an ordered queryset.')
+        self.ordering = ordering
+        page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != len(ordering):
+                raise ValidationError({'cursor': 'Invalid cursor.'})
+            queryset = queryset.filter(keyset_filter(ordering, values))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = encode_cursor(self._row_values(rows[-1])) if self.has_next else None
+        return rows
+
+    def _row_values(self, row):
+        if isinstance(row, dict):
+            return [row[key.lstrip('-')] for key in self.ordering]
+        return [getattr(row, key.lstrip('-')) for key in self.ordering]
+
+    def get_paginated_response(self, data):
+        return Response({'next_cursor': self.next_cursor, 'results': data})
@@ -107,3 +107,16 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Memory-mapped catalog snapshot shared by the workers of a host (apps/spaces/snapshot.py)
+SPACE_SNAPSHOT_PATH = env('SPACE_SNAPSHOT_PATH', default=os.path.join(BASE_DIR, 'var', 'space_snapshot.bin'))
+
+# Direct image uploads (apps/spaces/uploads.py): 'local' stand-in or 's3'
+SPACE_UPLOAD_STORE = env('SPACE_UPLOAD_STORE', default='local')
+SPACE_UPLOAD_BUCKET = env('SPACE_UPLOAD_BUCKET', default='')
+SPACE_UPLOAD_ENDPOINT_URL = env('SPACE_UPLOAD_ENDPOINT_URL', default=None)
+SPACE_UPLOAD_MAX_BYTES = env.int('SPACE_UPLOAD_MAX_BYTES', default=20 * 1024 * 1024)
+SPACE_UPLOAD_URL_TTL = env.int('SPACE_UPLOAD_URL_TTL', default=15 * 60)
+
+# Seconds a PENDING reservation holds its slot while the driver pays (apps/reservations/booking.py)
+RESERVATION_HOLD_TTL = env.int('RESERVATION_HOLD_TTL', default=15 * 60)
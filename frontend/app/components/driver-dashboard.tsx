@@ -10,7 +10,7 @@ import { Button } from "@/app/components/ui/button";
 import { Badge } from "@/app/components/ui/badge";
 import { Search, MapIcon, List, Plus, Car, Clock, CheckCircle } from "lucide-react";
 import { toast } from "sonner";
-import { getSpaces, createReservation, getMyReservations, cancelReservation, getVehicles, addVehicle, deleteVehicle } from "@/lib/api";
+import { getSpaces, getSpace, createReservation, getMyReservations, upcomingReservationFilters, cancelReservation, getVehicles, addVehicle, deleteVehicle } from "@/lib/api";
 
 export default function DriverDashboard({ user }: { user: any }) {
     const router = useRouter();
@@ -30,6 +30,9 @@ export default function DriverDashboard({ user }: { user: any }) {
     const [reservationDialogOpen, setReservationDialogOpen] = useState(false);
     const [reservingParking, setReservingParking] = useState<ParkingSpot | null>(null);
     const [myReservations, setMyReservations] = useState<any[]>([]);
+    const [reservationsCursor, setReservationsCursor] = useState<string | null>(null);
+    const [showAllReservations, setShowAllReservations] = useState(false); // Default: upcoming only
+    const [loadingMoreReservations, setLoadingMoreReservations] = useState(false);
     const [spaces, setSpaces] = useState<ParkingSpot[]>([]);
     const [loading, setLoading] = useState(true);
 
@@ -71,33 +74,47 @@ export default function DriverDashboard({ user }: { user: any }) {
         fetchSpaces();
     }, []);
 
+    // Map backend reservation to UI model
+    const toReservationItem = (r: any) => ({
+        id: r.id,
+        parkingTitle: r.space.title,
+        date: new Date(r.start_at).toLocaleDateString(),
+        startTime: new Date(r.start_at).getHours() + ":00",
+        duration: (new Date(r.end_at).getTime() - new Date(r.start_at).getTime()) / 3600000,
+        totalPrice: r.price_total,
+        carNumber: "등록됨",
+        status: r.status,
+        space: r.space, // Compact space; the detail dialog loads the full one
+        rawStartAt: r.start_at // Store raw start time for cancellation check
+    });
+
+    // One page at a time; "더 보기" follows the cursor
+    const fetchReservations = async (cursor: string | null = null) => {
+        const filters = showAllReservations ? {} : upcomingReservationFilters();
+        const page = await getMyReservations({ ...filters, cursor });
+        const items = page.results.map(toReservationItem);
+        setMyReservations(prev => (cursor ? [...prev, ...items] : items));
+        setReservationsCursor(page.next_cursor);
+    };
+
+    const handleLoadMoreReservations = async () => {
+        setLoadingMoreReservations(true);
+        try {
+            await fetchReservations(reservationsCursor);
+        } catch (e) {
+            console.error(e);
+            toast.error("예약 내역을 더 불러오지 못했습니다.");
+        } finally {
+            setLoadingMoreReservations(false);
+        }
+    };
+
     // Fetch My Reservations
     useEffect(() => {
         if (activeTab === 'reservations') {
-            const fetchReservations = async () => {
-                try {
-                    const data = await getMyReservations();
-                    // Map backend reservation to UI model
-                    const mapped = data.map((r: any) => ({
-                        id: r.id,
-                        parkingTitle: r.space.title, // Backend serializer should expand space
-                        date: new Date(r.start_at).toLocaleDateString(),
-                        startTime: new Date(r.start_at).getHours() + ":00",
-                        duration: (new Date(r.end_at).getTime() - new Date(r.start_at).getTime()) / 3600000,
-                        totalPrice: r.price_total,
-                        carNumber: "등록됨",
-                        status: r.status,
-                        space: r.space, // Add full space object
-                        rawStartAt: r.start_at // Store raw start time for cancellation check
-                    }));
-                    setMyReservations(mapped);
-                } catch (e) {
-                    console.error(e);
-                }
-            }
-            fetchReservations();
+            fetchReservations().catch((e) => console.error(e));
         }
-    }, [activeTab]);
+    }, [activeTab, showAllReservations]);
 
     // Fetch Vehicles
     useEffect(() => {
@@ -311,6 +328,22 @@ export default function DriverDashboard({ user }: { user: any }) {
                 {/* 내 예약 */}
                 {activeTab === 'reservations' && (
                     <div>
+                        <div className="flex gap-2 mb-4">
+                            <Button
+                                size="sm"
+                                variant={showAllReservations ? "outline" : "default"}
+                                onClick={() => setShowAllReservations(false)}
+                            >
+                                예정된 예약
+                            </Button>
+                            <Button
+                                size="sm"
+                                variant={showAllReservations ? "default" : "outline"}
+                                onClick={() => setShowAllReservations(true)}
+                            >
+                                전체 내역
+                            </Button>
+                        </div>
                         {myReservations.length === 0 ? (
                             <div className="text-center py-12">
                                 <Clock className="w-16 h-16 text-gray-400 mx-auto mb-4" />
@@ -323,9 +356,15 @@ export default function DriverDashboard({ user }: { user: any }) {
                                     <div
                                         key={reservation.id}
                                         className="bg-white p-6 rounded-lg border cursor-pointer hover:shadow-md transition-shadow"
-                                        onClick={() => {
-                                            setSelectedSpot(reservation.space);
-                                            setSelectedReservation(reservation);
+                                        onClick={async () => {
+                                            // Reservations carry a compact space; load the full one (images, products) for the dialog
+                                            try {
+                                                setSelectedSpot(await getSpace(reservation.space.id));
+                                                setSelectedReservation(reservation);
+                                            } catch (e) {
+                                                console.error(e);
+                                                toast.error("주차장 정보를 불러오는데 실패했습니다.");
+                                            }
                                         }}
                                     >
                                         <div className="flex justify-between items-start mb-4">
@@ -346,6 +385,13 @@ export default function DriverDashboard({ user }: { user: any }) {
                                         <p className="text-xs text-blue-500 text-right mt-2">클릭하여 주차장 정보 확인 &gt;</p>
                                     </div>
                                 ))}
+                                {reservationsCursor && (
+                                    <div className="text-center">
+                                        <Button variant="outline" onClick={handleLoadMoreReservations} disabled={loadingMoreReservations}>
+                                            {loadingMoreReservations ? "불러오는 중..." : "더 보기"}
+                                        </Button>
+                                    </div>
+                                )}
                             </div>
                         )}
                     </div>
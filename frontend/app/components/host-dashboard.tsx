@@ -6,7 +6,7 @@ import { Button } from "@/app/components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/app/components/ui/card";
 import { Badge } from "@/app/components/ui/badge";
 import { Plus, List as ListIcon, DollarSign, Calendar, CheckCircle, Car } from "lucide-react";
-import { getSpaces, toggleSpaceStatus, deleteSpace, getHostReservations } from "@/lib/api";
+import { getSpaces, toggleSpaceStatus, deleteSpace, getHostReservations, upcomingReservationFilters } from "@/lib/api";
 import { ParkingSpot } from "@/app/components/parking-card";
 import { toast } from "sonner";
 
@@ -14,18 +14,25 @@ export default function HostDashboard({ user }: { user: any }) {
     const router = useRouter();
     const [mySpaces, setMySpaces] = useState<ParkingSpot[]>([]);
     const [incomingReservations, setIncomingReservations] = useState<any[]>([]);
+    const [reservationsCursor, setReservationsCursor] = useState<string | null>(null);
+    const [showAllReservations, setShowAllReservations] = useState(false); // Default: upcoming only
+    const [loadingMoreReservations, setLoadingMoreReservations] = useState(false);
     const [loading, setLoading] = useState(true);
     const [deletingSpaceId, setDeletingSpaceId] = useState<number | null>(null);
 
+    const reservationFilters = () => (showAllReservations ? {} : upcomingReservationFilters());
+
     const fetchData = async () => {
         try {
             const [spaces, reservations] = await Promise.all([
                 getSpaces({ mine: true }),
-                getHostReservations()
+                getHostReservations(reservationFilters())
             ]);
             // Ensure data is an array
             setMySpaces(Array.isArray(spaces) ? spaces : []);
-            setIncomingReservations(Array.isArray(reservations) ? reservations : []);
+            // First page only; "더 보기" follows the cursor
+            setIncomingReservations(reservations.results);
+            setReservationsCursor(reservations.next_cursor);
         } catch (e) {
             console.error(e);
             toast.error("데이터를 불러오는 데 실패했습니다.");
@@ -36,9 +43,23 @@ export default function HostDashboard({ user }: { user: any }) {
 
     useEffect(() => {
         fetchData();
-    }, [user.id]);
+    }, [user.id, showAllReservations]);
+
+    const handleLoadMoreReservations = async () => {
+        setLoadingMoreReservations(true);
+        try {
+            const page = await getHostReservations({ ...reservationFilters(), cursor: reservationsCursor });
+            setIncomingReservations(prev => [...prev, ...page.results]);
+            setReservationsCursor(page.next_cursor);
+        } catch (e) {
+            console.error(e);
+            toast.error("예약 내역을 더 불러오지 못했습니다.");
+        } finally {
+            setLoadingMoreReservations(false);
+        }
+    };
 
-    // Calculate total income (confirmed & completed)
+    // Calculate total income (confirmed & completed) of the loaded reservations
     const totalIncome = incomingReservations
         .filter(r => ['CONFIRMED', 'COMPLETED'].includes(r.status))
         .reduce((sum, r) => sum + Number(r.price_total), 0);
@@ -106,7 +127,7 @@ export default function HostDashboard({ user }: { user: any }) {
                     </CardHeader>
                     <CardContent>
                         <div className="text-2xl font-bold">{totalIncome.toLocaleString()}원</div>
-                        <p className="text-xs text-muted-foreground">확정된 예약 기준</p>
+                        <p className="text-xs text-muted-foreground">불러온 확정 예약 기준</p>
                     </CardContent>
                 </Card>
                 <Card>
@@ -115,8 +136,8 @@ export default function HostDashboard({ user }: { user: any }) {
                         <Calendar className="h-4 w-4 text-muted-foreground" />
                     </CardHeader>
                     <CardContent>
-                        <div className="text-2xl font-bold">{incomingReservations.length}건</div>
-                        <p className="text-xs text-muted-foreground">전체 예약 내역</p>
+                        <div className="text-2xl font-bold">{incomingReservations.length}{reservationsCursor ? "+" : ""}건</div>
+                        <p className="text-xs text-muted-foreground">{showAllReservations ? "전체 예약 내역" : "예정된 예약"}</p>
                     </CardContent>
                 </Card>
             </div>
@@ -181,9 +202,31 @@ export default function HostDashboard({ user }: { user: any }) {
             </div>
 
             {/* Incoming Reservations List */}
-            {incomingReservations.length > 0 && (
-                <div className="mb-12">
-                    <h2 className="text-xl font-bold mb-4">들어온 예약 목록</h2>
+            <div className="mb-12">
+                <div className="flex justify-between items-center mb-4">
+                    <h2 className="text-xl font-bold">들어온 예약 목록</h2>
+                    <div className="flex gap-2">
+                        <Button
+                            size="sm"
+                            variant={showAllReservations ? "outline" : "default"}
+                            onClick={() => setShowAllReservations(false)}
+                        >
+                            예정된 예약
+                        </Button>
+                        <Button
+                            size="sm"
+                            variant={showAllReservations ? "default" : "outline"}
+                            onClick={() => setShowAllReservations(true)}
+                        >
+                            전체 내역
+                        </Button>
+                    </div>
+                </div>
+                {incomingReservations.length === 0 ? (
+                    <div className="text-center py-10 text-gray-500 border rounded-lg bg-gray-50">
+                        들어온 예약이 없습니다.
+                    </div>
+                ) : (
                     <div className="space-y-4">
                         {incomingReservations.map((res) => (
                             <div key={res.id} className="bg-white p-6 rounded-lg border flex justify-between items-center">
@@ -253,9 +296,16 @@ export default function HostDashboard({ user }: { user: any }) {
                                 </div>
                             </div>
                         ))}
+                        {reservationsCursor && (
+                            <div className="text-center">
+                                <Button variant="outline" onClick={handleLoadMoreReservations} disabled={loadingMoreReservations}>
+                                    {loadingMoreReservations ? "불러오는 중..." : "더 보기"}
+                                </Button>
+                            </div>
+                        )}
                     </div>
-                </div>
-            )}
+                )}
+            </div>
         </div>
     );
 }
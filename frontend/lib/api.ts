@@ -56,13 +56,38 @@ export const cancelReservation = async (id: number) => {
     return response.data;
 };
 
-export const getMyReservations = async () => {
-    const response = await api.get('/reservations/');
+export const getSpace = async (id: number) => {
+    const response = await api.get(`/spaces/${id}/`);
     return response.data;
 };
 
-export const getHostReservations = async () => {
-    const response = await api.get('/reservations/', { params: { host: true } });
+// The reservation list is keyset-paginated: pass next_cursor back as cursor for the next page
+export type ReservationPage = { results: any[]; next_cursor: string | null };
+
+export type ReservationFilters = {
+    status?: string; // comma-separated, e.g. 'PENDING,CONFIRMED'
+    date_from?: string; // YYYY-MM-DD, on the reservation's start date
+    date_to?: string;
+    cursor?: string | null;
+};
+
+// Default dashboard view: pending or confirmed reservations starting today or later
+export const upcomingReservationFilters = (): ReservationFilters => {
+    const today = new Date();
+    const pad = (n: number) => String(n).padStart(2, '0');
+    return {
+        status: 'PENDING,CONFIRMED',
+        date_from: `${today.getFullYear()}-${pad(today.getMonth() + 1)}-${pad(today.getDate())}`,
+    };
+};
+
+export const getMyReservations = async (filters: ReservationFilters = {}): Promise<ReservationPage> => {
+    const response = await api.get('/reservations/', { params: filters });
+    return response.data;
+};
+
+export const getHostReservations = async (filters: ReservationFilters = {}): Promise<ReservationPage> => {
+    const response = await api.get('/reservations/', { params: { ...filters, host: true } });
     return response.data;
 };
 
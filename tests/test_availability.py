@@ -0,0 +1,117 @@
+import datetime
+from django.utils import timezone
+from apps.spaces.availability import day_segments, day_window
+
+def aware(*args):
+    return timezone.make_aware(datetime.datetime(*args))
+
+def test_day_segments_single_day():
+    # 2026-10-19 is a Monday
+    segments = list(day_segments(aware(2026, 10, 19, 10, 0), aware(2026, 10, 19, 12, 30)))
+    assert segments == [(0, datetime.time(10, 0), datetime.time(12, 30), False)]
+
+def test_day_segments_cross_midnight():
+    segments = list(day_segments(aware(2026, 10, 19, 22, 0), aware(2026, 10, 20, 2, 0)))
+    assert segments == [
+        (0, datetime.time(22, 0), datetime.time(0, 0), True),
+        (1, datetime.time(0, 0), datetime.time(2, 0), False),
+    ]
+
+def test_day_window_is_one_full_segment():
+    start_at, end_at = day_window(datetime.date(2026, 10, 19))
+    assert end_at - start_at == datetime.timedelta(days=1)
+    assert list(day_segments(start_at, end_at)) == [(0, datetime.time(0, 0), datetime.time(0, 0), True)]
+
+class Rule:
+    def __init__(self, day_of_week, start_time, end_time):
+        self.day_of_week = day_of_week
+        self.start_time = start_time
+        self.end_time = end_time
+
+def test_weekly_slot_masks():
+    from apps.spaces.availability import compile_rules, weekly_slot_masks, FULL_DAY_MASK
+
+    masks = weekly_slot_masks(compile_rules([
+        Rule(0, datetime.time(9, 0), datetime.time(18, 0)),
+        Rule(1, datetime.time(0, 0), datetime.time(23, 59)),
+        Rule(2, datetime.time(9, 15), datetime.time(10, 0)),  # only 09:30-10:00 is a full slot
+    ]))
+    assert masks[0] == ((1 << 18) - 1) << 18  # slots 18..35 = 09:00-18:00
+    assert masks[1] == FULL_DAY_MASK
+    assert masks[2] == 1 << 19
+    assert masks[3] == 0
+
+def test_booked_slot_masks_span_days():
+    from apps.spaces.availability import booked_slot_masks
+
+    monday = datetime.date(2026, 10, 19)
+    periods = [(aware(2026, 10, 19, 23, 0), aware(2026, 10, 20, 1, 0))]
+    masks = booked_slot_masks(periods, monday, 3)
+    assert masks[monday] == 0b11 << 46
+    assert masks[monday + datetime.timedelta(days=1)] == 0b11
+    assert masks[monday + datetime.timedelta(days=2)] == 0
+
+def test_booked_slot_masks_with_capacity():
+    from apps.spaces.availability import booked_slot_masks
+
+    monday = datetime.date(2026, 10, 19)
+    periods = [
+        (aware(2026, 10, 19, 9, 0), aware(2026, 10, 19, 11, 0)),   # slots 18-21
+        (aware(2026, 10, 19, 10, 0), aware(2026, 10, 19, 12, 0)),  # slots 20-23
+        (aware(2026, 10, 19, 10, 30), aware(2026, 10, 19, 11, 0)),  # slot 21
+    ]
+    assert booked_slot_masks(periods, monday, 1, capacity=2)[monday] == 0b11 << 20
+    assert booked_slot_masks(periods, monday, 1, capacity=3)[monday] == 1 << 21
+    assert booked_slot_masks(periods, monday, 1, capacity=4)[monday] == 0
+
+def test_compile_rules_merges_adjacent_and_overnight_rules():
+    from apps.spaces.availability import compile_rules
+
+    intervals = compile_rules([
+        Rule(0, datetime.time(9, 0), datetime.time(12, 0)),
+        Rule(0, datetime.time(12, 0), datetime.time(18, 0)),
+        Rule(0, datetime.time(20, 0), datetime.time(23, 59)),
+        Rule(1, datetime.time(0, 0), datetime.time(6, 0)),
+    ])
+    assert intervals == [[540, 1080], [1200, 1440 + 360]]
+
+def test_is_covered():
+    from apps.spaces.availability import compile_rules, is_covered
+
+    intervals = compile_rules([
+        Rule(0, datetime.time(9, 0), datetime.time(18, 0)),
+        Rule(0, datetime.time(20, 0), datetime.time(23, 59)),
+        Rule(1, datetime.time(0, 0), datetime.time(6, 0)),
+        Rule(6, datetime.time(22, 0), datetime.time(23, 59)),
+    ])
+    # Monday 2026-10-19
+    assert is_covered(intervals, aware(2026, 10, 19, 10, 0), aware(2026, 10, 19, 12, 0))
+    assert not is_covered(intervals, aware(2026, 10, 19, 17, 0), aware(2026, 10, 19, 19, 0))
+    # Monday night into Tuesday morning
+    assert is_covered(intervals, aware(2026, 10, 19, 22, 0), aware(2026, 10, 20, 2, 0))
+    assert not is_covered(intervals, aware(2026, 10, 19, 22, 0), aware(2026, 10, 20, 7, 0))
+    # Sunday night into Monday morning is not open (Monday opens at 09:00)
+    assert not is_covered(intervals, aware(2026, 10, 18, 23, 0), aware(2026, 10, 19, 1, 0))
+    assert is_covered(intervals, aware(2026, 10, 18, 22, 0), aware(2026, 10, 19, 0, 0))
+
+def test_is_covered_wraps_the_week():
+    from apps.spaces.availability import compile_rules, is_covered
+
+    intervals = compile_rules([
+        Rule(6, datetime.time(0, 0), datetime.time(23, 59)),
+        Rule(0, datetime.time(0, 0), datetime.time(8, 0)),
+    ])
+    assert is_covered(intervals, aware(2026, 10, 18, 20, 0), aware(2026, 10, 19, 8, 0))
+
+def test_first_free_slot_skips_booked_and_past_slots():
+    from apps.spaces.availability import compile_rules, build_slot_calendar, first_free_slot
+
+    intervals = compile_rules([Rule(0, datetime.time(9, 0), datetime.time(18, 0))])
+    monday = datetime.date(2026, 10, 19)
+    periods = [(aware(2026, 10, 19, 10, 0), aware(2026, 10, 19, 12, 0))]
+
+    calendar = build_slot_calendar(intervals, periods, monday, 7, now=aware(2026, 10, 19, 9, 45))
+    assert first_free_slot(calendar) == aware(2026, 10, 19, 12, 0)
+
+    calendar = build_slot_calendar(intervals, periods, monday, 7, now=aware(2026, 10, 19, 18, 0))
+    assert first_free_slot(calendar) is None
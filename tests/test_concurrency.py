@@ -1,9 +1,12 @@
 import pytest
 import datetime
+import threading
+from django.db import connection
 from django.utils import timezone
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 from apps.spaces.models import Space, SpaceProduct, AvailabilityRule
+from apps.reservations.booking import SlotUnavailable, book
 from apps.reservations.models import Reservation
 
 User = get_user_model()
@@ -102,3 +105,33 @@ def test_non_overlapping_confirmation(api_client, setup_data):
     # Confirm B -> Success
     response = api_client.post(f'/reservations/{res_b.id}/confirm/')
     assert response.status_code == 200
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_pending_bookings_are_serialized(setup_data):
+    date = setup_data['date']
+    start_at = timezone.make_aware(datetime.datetime.combine(date, datetime.time(10, 0)))
+    end_at = timezone.make_aware(datetime.datetime.combine(date, datetime.time(12, 0)))
+    barrier = threading.Barrier(4)
+    results = []
+
+    def attempt():
+        barrier.wait()
+        try:
+            book(setup_data['space'].pk, start_at, end_at, lambda: Reservation.objects.create(
+                space=setup_data['space'], driver=setup_data['driver'], product=setup_data['hourly'],
+                start_at=start_at, end_at=end_at, price_total=2000, status='PENDING'
+            ))
+            results.append('booked')
+        except SlotUnavailable:
+            results.append('conflict')
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=attempt) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ['booked', 'conflict', 'conflict', 'conflict']
+    assert Reservation.objects.filter(space=setup_data['space']).count() == 1
@@ -0,0 +1,65 @@
+import pytest
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+from apps.spaces.geo import parse_geo_params, haversine_m
+from common.pagination import encode_cursor, decode_cursor
+
+def test_parse_geo_params_modes():
+    assert parse_geo_params({}) is None
+
+    radius = parse_geo_params({'lat': '37.5', 'lng': '127.0', 'radius': '500'})
+    assert radius['center'] == (37.5, 127.0)
+    assert radius['radius'] == 500
+    assert radius['nearest'] is None
+
+    nearest = parse_geo_params({'lat': '37.5', 'lng': '127.0', 'nearest': '10'})
+    assert nearest['nearest'] == 10
+    assert nearest['radius'] is None
+
+    bbox = parse_geo_params({'bbox': '37.4,126.9,37.6,127.1'})
+    assert bbox['center'] == pytest.approx((37.5, 127.0))
+    # The prefilter circle must reach every corner of the box
+    assert bbox['radius'] >= haversine_m(37.5, 127.0, 37.4, 126.9)
+
+def test_parse_geo_params_rejects_bad_input():
+    with pytest.raises(ValidationError):
+        parse_geo_params({'lat': '37.5', 'lng': '127.0'})
+    with pytest.raises(ValidationError):
+        parse_geo_params({'lat': '137.5', 'lng': '127.0', 'radius': '100'})
+    with pytest.raises(ValidationError):
+        parse_geo_params({'bbox': '37.6,126.9,37.4,127.1'})
+    with pytest.raises(ValidationError) as excinfo:
+        parse_geo_params({'lat': '37.5', 'radius': '100'})
+    assert 'lng' in excinfo.value.detail
+    with pytest.raises(ValidationError) as excinfo:
+        parse_geo_params(QueryDict('lng=127.0&radius=100'))
+    assert 'lat' in excinfo.value.detail
+
+def test_cursor_roundtrip():
+    values = [0.0012345678901234, 42]
+    assert decode_cursor(encode_cursor(values)) == values
+    with pytest.raises(ValidationError):
+        decode_cursor('not-a-cursor')
+
+def test_grid_cells_nest_across_zoom_levels():
+    from apps.spaces.geo import grid_xy, GRID_BITS
+    from apps.spaces.clusters import cell_of, MIN_ZOOM, MAX_ZOOM
+
+    x, y = grid_xy(37.5665, 126.9780)
+    assert 0 <= x < 1 << GRID_BITS and 0 <= y < 1 << GRID_BITS
+    # North is a smaller y
+    assert grid_xy(37.6, 126.9780)[1] < y
+
+    for zoom in range(MIN_ZOOM, MAX_ZOOM):
+        parent = cell_of(x, y, zoom)
+        child = cell_of(x, y, zoom + 1)
+        assert (child[0] >> 1, child[1] >> 1) == parent
+
+def test_changes_cursor_positions():
+    from apps.spaces.sync import parse_changes_cursor
+
+    assert parse_changes_cursor(encode_cursor(['2026-01-01 00:00:00+00:00', 7, None, 0])) == (
+        ['2026-01-01 00:00:00+00:00', 7], None,
+    )
+    with pytest.raises(ValidationError):
+        parse_changes_cursor(encode_cursor([1, 2]))
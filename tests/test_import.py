@@ -0,0 +1,42 @@
+import io
+import json
+from apps.spaces.importer import import_spaces, read_records
+
+
+def test_read_records_csv_and_ndjson():
+    csv_data = (
+        'title,address,lat,lng,products\n'
+        'Lot A,Seoul,37.5,127.0,"[{""type"": ""HOURLY"", ""price"": 1000}]"\n'
+        'Lot B,Seoul,37.6,,\n'
+    ).encode('utf-8')
+    records = list(read_records(io.BytesIO(csv_data), 'csv'))
+    assert records[0] == (1, {
+        'title': 'Lot A', 'address': 'Seoul', 'lat': '37.5', 'lng': '127.0',
+        'products': '[{"type": "HOURLY", "price": 1000}]',
+    })
+    # Empty cells are left out, so required fields fail validation
+    assert 'lng' not in records[1][1]
+
+    ndjson = b'{"title": "Lot A"}\n\nnot json\n[1]\n'
+    assert list(read_records(io.BytesIO(ndjson), 'ndjson')) == [(1, {'title': 'Lot A'}), (3, None), (4, None)]
+
+
+def test_import_reports_invalid_rows_without_loading():
+    lines = [
+        json.dumps({
+            'title': 'Lot A', 'address': 'Seoul', 'lat': 37.5, 'lng': 127.0,
+            'products': [{'type': 'HOURLY', 'price': 1000}],
+            'availability_rules': [{'day_of_week': 0, 'start_time': '09:00', 'end_time': '18:00'}],
+        }),
+        json.dumps({'title': 'Lot B', 'address': 'Seoul', 'lat': 137.5, 'lng': 127.0}),
+        json.dumps({
+            'title': 'Lot C', 'address': 'Seoul', 'lat': 37.5, 'lng': 127.0,
+            'availability_rules': [{'day_of_week': 0, 'start_time': '18:00', 'end_time': '09:00'}],
+        }),
+    ]
+    records = read_records(io.BytesIO('\n'.join(lines).encode('utf-8')), 'ndjson')
+    report = import_spaces(None, records, dry_run=True)
+    assert report['created'] == 1
+    assert report['failed'] == 2
+    assert [error['row'] for error in report['errors']] == [2, 3]
+    assert 'lat' in report['errors'][0]['errors']
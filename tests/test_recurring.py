@@ -0,0 +1,45 @@
+import datetime
+from django.utils import timezone
+from apps.reservations.booking import peak_overlap
+from apps.reservations.recurring import BookedPeriods, MAX_OCCURRENCES, expand
+
+
+def aware(*args):
+    return timezone.make_aware(datetime.datetime(*args))
+
+
+def test_expand_weekdays_until():
+    # Monday 2030-01-07 08:00-09:00, repeated Monday/Wednesday for two weeks
+    occurrences = expand(aware(2030, 1, 7, 8), aware(2030, 1, 7, 9), weekdays=[0, 2], until=datetime.date(2030, 1, 16))
+    assert [timezone.localtime(start).date().day for start, _ in occurrences] == [7, 9, 14, 16]
+    assert all(end - start == datetime.timedelta(hours=1) for start, end in occurrences)
+    assert all(timezone.localtime(start).hour == 8 for start, _ in occurrences)
+
+
+def test_expand_count_and_cap():
+    occurrences = expand(aware(2030, 1, 7, 22), aware(2030, 1, 8, 2), count=3)
+    assert [timezone.localtime(start).date().day for start, _ in occurrences] == [7, 14, 21]
+    assert occurrences[0][1] == aware(2030, 1, 8, 2)
+    assert len(expand(aware(2030, 1, 7, 8), aware(2030, 1, 7, 9), weekdays=range(7), count=1000)) == MAX_OCCURRENCES
+
+
+def test_booked_periods_fits():
+    # A long reservation containing a short one
+    booked = BookedPeriods([(aware(2030, 1, 7, 9), aware(2030, 1, 7, 10)), (aware(2030, 1, 7, 8), aware(2030, 1, 7, 18))])
+    assert not booked.fits(aware(2030, 1, 7, 12), aware(2030, 1, 7, 13))
+    assert booked.fits(aware(2030, 1, 7, 18), aware(2030, 1, 7, 19))
+    assert booked.fits(aware(2030, 1, 7, 7), aware(2030, 1, 7, 8))
+
+    lot = BookedPeriods([(aware(2030, 1, 7, 9), aware(2030, 1, 7, 10)), (aware(2030, 1, 7, 8), aware(2030, 1, 7, 18))], capacity=2)
+    assert lot.fits(aware(2030, 1, 7, 12), aware(2030, 1, 7, 13))
+    assert not lot.fits(aware(2030, 1, 7, 9, 30), aware(2030, 1, 7, 11))
+    lot.add(aware(2030, 1, 7, 12), aware(2030, 1, 7, 13))
+    assert not lot.fits(aware(2030, 1, 7, 12, 30), aware(2030, 1, 7, 14))
+
+
+def test_peak_overlap_sweep():
+    periods = [(1, 5), (2, 3), (3, 6), (5, 7)]
+    assert peak_overlap(periods) == 2
+    assert peak_overlap(periods + [(2, 4)]) == 3
+    assert peak_overlap(periods, 6, 10) == 1
+    assert peak_overlap([]) == 0
@@ -0,0 +1,18 @@
+import io
+from PIL import Image
+from apps.spaces.renditions import render, RENDITION_SIZES
+
+
+def test_render_fits_sizes_without_upscaling():
+    buffer = io.BytesIO()
+    Image.new('RGBA', (1200, 600), (10, 20, 30, 255)).save(buffer, 'PNG')
+    buffer.seek(0)
+
+    rendered = render(buffer)
+    assert set(rendered) == set(RENDITION_SIZES)
+
+    thumb = Image.open(io.BytesIO(rendered['thumb']['jpeg']))
+    assert thumb.format == 'JPEG' and thumb.size == (320, 160)
+    assert Image.open(io.BytesIO(rendered['thumb']['webp'])).format == 'WEBP'
+    # Smaller than the box: kept at original size
+    assert Image.open(io.BytesIO(rendered['large']['jpeg'])).size == (1200, 600)
@@ -4,6 +4,9 @@ from django.utils import timezone
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 from apps.spaces.models import Space, SpaceProduct, AvailabilityRule
+from psycopg2.extras import DateTimeTZRange
+from apps.reservations.booking import SlotUnavailable, book, confirm, ensure_free, release_expired_holds
+from apps.reservations.fleet import FleetUnavailable, book_fleet
 from apps.reservations.models import Reservation
 
 User = get_user_model()
@@ -145,3 +148,114 @@ def test_cancel_reservation(api_client, setup_data):
     assert response.status_code == 200
     res.refresh_from_db()
     assert res.status == 'CANCELED'
+
+def test_overlap_uses_half_open_period():
+    start_at = timezone.make_aware(datetime.datetime(2030, 1, 7, 10, 0))
+    end_at = timezone.make_aware(datetime.datetime(2030, 1, 7, 12, 0))
+    qs = Reservation.objects.active().overlapping(start_at, end_at)
+    lookup = qs.query.where.children[-1]
+    assert lookup.lookup_name == 'overlap'
+    assert lookup.lhs.target.name == 'period'
+    assert lookup.rhs == DateTimeTZRange(start_at, end_at, '[)')
+
+@pytest.mark.django_db
+def test_lapsed_hold_frees_slot_and_is_released(setup_data):
+    start_at = timezone.now() + datetime.timedelta(days=1)
+    end_at = start_at + datetime.timedelta(hours=2)
+    hold = Reservation.objects.create(
+        space=setup_data['space'], driver=setup_data['driver'], product=setup_data['hourly'],
+        start_at=start_at, end_at=end_at, price_total=2000, status='PENDING',
+        hold_expires_at=timezone.now() - datetime.timedelta(seconds=1),
+    )
+    ensure_free(setup_data['space'].pk, start_at, end_at)
+
+    other = Reservation.objects.create(
+        space=setup_data['space'], driver=setup_data['driver'], product=setup_data['hourly'],
+        start_at=start_at, end_at=end_at, price_total=2000, status='CONFIRMED',
+    )
+    with pytest.raises(SlotUnavailable):
+        confirm(hold)
+    with pytest.raises(SlotUnavailable):
+        ensure_free(setup_data['space'].pk, start_at, end_at)
+
+    assert release_expired_holds() == 1
+    hold.refresh_from_db()
+    other.refresh_from_db()
+    assert (hold.status, other.status) == ('CANCELED', 'CONFIRMED')
+
+
+@pytest.mark.django_db
+def test_fleet_booking_is_all_or_nothing(setup_data):
+    other = Space.objects.create(host=setup_data['host'], title='S2', lat=0, lng=0, is_active=True, is_auto_approval=False)
+    AvailabilityRule.objects.create(space=other, day_of_week=0, start_time='09:00', end_time='18:00')
+    other_hourly = SpaceProduct.objects.create(space=other, type='HOURLY', price=500, is_active=True)
+
+    monday = timezone.localdate() + datetime.timedelta(days=7 - timezone.localdate().weekday())
+    start_at = timezone.make_aware(datetime.datetime.combine(monday, datetime.time(10, 0)))
+    end_at = start_at + datetime.timedelta(hours=2)
+    Reservation.objects.create(
+        space=other, driver=setup_data['driver'], product=other_hourly,
+        start_at=start_at, end_at=end_at, price_total=1000, status='CONFIRMED',
+    )
+
+    with pytest.raises(FleetUnavailable) as excinfo:
+        book_fleet([setup_data['hourly'], other_hourly], start_at, end_at, driver=setup_data['driver'])
+    assert excinfo.value.space_ids == {other.pk: 'booked'}
+    assert Reservation.objects.count() == 1
+
+    later = start_at + datetime.timedelta(hours=3)
+    created, _ = book_fleet([other_hourly, setup_data['hourly']], later, later + datetime.timedelta(hours=1), driver=setup_data['driver'])
+    assert sorted((r.space_id, r.status, r.price_total) for r in created) == sorted([
+        (setup_data['space'].pk, 'CONFIRMED', 1000), (other.pk, 'PENDING', 500),
+    ])
+
+@pytest.mark.django_db
+def test_capacity_allows_concurrent_bookings_up_to_stalls(setup_data):
+    space = setup_data['space']
+    space.capacity = 2
+    space.save()
+    start_at = timezone.now() + datetime.timedelta(days=1)
+
+    def reserve(offset_hours, hours):
+        begin = start_at + datetime.timedelta(hours=offset_hours)
+        finish = begin + datetime.timedelta(hours=hours)
+        return book(space.pk, begin, finish, lambda: Reservation.objects.create(
+            space=space, driver=setup_data['driver'], product=setup_data['hourly'],
+            start_at=begin, end_at=finish, price_total=1000, status='CONFIRMED',
+        ), capacity=space.capacity)
+
+    reserve(0, 2)
+    reserve(1, 2)
+    # Both stalls are taken from hour 1 to 2, but only one at hour 2
+    with pytest.raises(SlotUnavailable):
+        reserve(1, 1)
+    reserve(2, 1)
+    assert Reservation.objects.filter(space=space).count() == 3
+
+@pytest.mark.django_db
+def test_reservation_list_is_keyset_paginated_and_filtered(api_client, setup_data, django_assert_max_num_queries):
+    start_at = timezone.now() + datetime.timedelta(days=1)
+    for hours in range(5):
+        begin = start_at + datetime.timedelta(hours=hours)
+        Reservation.objects.create(
+            space=setup_data['space'], driver=setup_data['driver'], product=setup_data['hourly'],
+            start_at=begin, end_at=begin + datetime.timedelta(hours=1), price_total=1000,
+            status='CANCELED' if hours == 0 else 'CONFIRMED',
+        )
+    api_client.force_authenticate(user=setup_data['driver'])
+
+    with django_assert_max_num_queries(3):
+        response = api_client.get('/api/reservations/reservations/', {'page_size': 3, 'status': 'confirmed'})
+    assert response.status_code == 200
+    assert len(response.data['results']) == 3
+    assert response.data['results'][0]['space'] == {
+        'id': setup_data['space'].id, 'title': 'S', 'address': setup_data['space'].address, 'lat': '0.000000', 'lng': '0.000000',
+    }
+    response = api_client.get('/api/reservations/reservations/', {
+        'page_size': 3, 'status': 'confirmed', 'cursor': response.data['next_cursor'],
+    })
+    assert len(response.data['results']) == 1
+    assert response.data['next_cursor'] is None
+
+    response = api_client.get('/api/reservations/reservations/', {'status': 'unknown'})
+    assert response.status_code == 400
@@ -0,0 +1,58 @@
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+from apps.spaces.models import SpaceCard
+from apps.spaces.snapshot import SnapshotReader, write_snapshot
+
+
+def card(space_id, title, **kwargs):
+    return SpaceCard(
+        space_id=space_id, title=title, address='서울 중구', lat=Decimal('37.566500'), lng=Decimal('126.978000'),
+        is_auto_approval=True, **kwargs,
+    )
+
+
+def test_snapshot_roundtrip_and_paging(tmp_path):
+    path = str(tmp_path / 'spaces.bin')
+    next_free_at = datetime(2026, 10, 19, 3, 0, tzinfo=timezone.utc)
+    write_snapshot(path, [
+        card(3, '시청 주차장', hourly_price=3000, next_free_at=next_free_at, cover_image='spaces/a.jpg'),
+        card(5, 'Lot B', day_pass_price=20000),
+        card(9, 'Lot C'),
+    ])
+
+    snapshot = SnapshotReader(path).current()
+    assert snapshot.count == 3
+
+    cards, has_next = snapshot.page_before(None, 2)
+    assert [c.space_id for c in cards] == [9, 5]
+    assert has_next
+    assert cards[1].day_pass_price == 20000 and cards[1].hourly_price is None
+
+    cards, has_next = snapshot.page_before(5, 2)
+    assert [c.space_id for c in cards] == [3]
+    assert not has_next
+    first = cards[0]
+    assert first.title == '시청 주차장'
+    assert first.lat == Decimal('37.566500')
+    assert first.next_free_at == next_free_at
+    assert first.cover_image.name == 'spaces/a.jpg'
+
+
+def test_reader_follows_replaced_file(tmp_path):
+    path = str(tmp_path / 'spaces.bin')
+    write_snapshot(path, [card(1, 'Old')])
+    reader = SnapshotReader(path)
+    old = reader.current()
+
+    write_snapshot(path, [card(1, 'New'), card(2, 'Other')])
+    reader._checked_at = 0
+    new = reader.current()
+    assert new.count == 2 and new.card(0).title == 'New'
+    # The old mapping stays readable for requests still using it
+    assert old.card(0).title == 'Old'
+
+
+def test_reader_without_snapshot(tmp_path):
+    assert SnapshotReader(str(tmp_path / 'missing.bin')).current() is None
+    assert not os.path.exists(tmp_path / 'missing.bin')
@@ -1,4 +1,5 @@
 import pytest
+from datetime import timedelta
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 from apps.spaces.models import Space, SpaceProduct
@@ -82,3 +83,85 @@ def test_availability_rule_creation():
         'day_of_week': 0, 'start_time': '10:00', 'end_time': '12:00'
     })
     assert response.status_code == 201
+
+@pytest.mark.django_db
+def test_nested_update_query_count_does_not_grow_with_rules(django_assert_max_num_queries):
+    from apps.spaces.serializers import SpaceSerializer
+
+    host = User.objects.create_user(username='host', password='pw', is_host=True)
+    space = Space.objects.create(host=host, title='S', address='A', lat=0, lng=0)
+    SpaceProduct.objects.create(space=space, type='DAY_PASS', price=20000)
+
+    rules = [
+        {'day_of_week': day, 'start_time': f'{hour:02d}:00', 'end_time': f'{hour:02d}:30'}
+        for day in range(7) for hour in range(8, 14)
+    ]
+    serializer = SpaceSerializer(space, data={
+        'availability_rules': rules,
+        'products': [{'type': 'HOURLY', 'price': 1000}],
+    }, partial=True)
+    assert serializer.is_valid(), serializer.errors
+    with django_assert_max_num_queries(15):
+        serializer.save()
+
+    space.refresh_from_db()
+    assert space.availability_rules.count() == len(rules)
+    assert space.availability_intervals is None
+    products = {p.type: p.is_active for p in space.products.all()}
+    assert products == {'HOURLY': True, 'DAY_PASS': False}
+
+    # Dropping most rules rewrites one in place and deletes the rest
+    serializer = SpaceSerializer(space, data={
+        'availability_rules': [{'day_of_week': 0, 'start_time': '09:00', 'end_time': '18:00'}],
+    }, partial=True)
+    assert serializer.is_valid(), serializer.errors
+    with django_assert_max_num_queries(15):
+        serializer.save()
+    assert list(space.availability_rules.values_list('day_of_week', flat=True)) == [0]
+
+@pytest.mark.django_db
+def test_bulk_deactivate_and_reprice():
+    client = APIClient()
+    host = User.objects.create_user(username='host', password='pw', is_host=True)
+    other = User.objects.create_user(username='other', password='pw', is_host=True)
+    spaces = [Space.objects.create(host=host, title=f'S{i}', address='A', lat=0, lng=0) for i in range(3)]
+    foreign = Space.objects.create(host=other, title='F', address='A', lat=0, lng=0)
+    for space in spaces:
+        SpaceProduct.objects.create(space=space, type='HOURLY', price=1000)
+    client.force_authenticate(user=host)
+
+    # Ownership is checked for the whole set
+    response = client.post('/api/spaces/spaces/bulk-deactivate/', {'ids': [spaces[0].id, foreign.id]}, format='json')
+    assert response.status_code == 403
+    assert Space.objects.filter(is_active=False).count() == 0
+
+    response = client.post('/api/spaces/spaces/bulk-deactivate/', {'ids': [s.id for s in spaces[:2]]}, format='json')
+    assert response.status_code == 200
+    assert response.data['updated'] == 2
+    assert set(Space.objects.filter(is_active=False).values_list('id', flat=True)) == {spaces[0].id, spaces[1].id}
+
+    response = client.post('/api/spaces/spaces/bulk-reprice/', {
+        'filter': {'is_active': True}, 'type': 'HOURLY', 'percent': 10,
+    }, format='json')
+    assert response.status_code == 200
+    assert response.data['updated'] == 1
+    assert SpaceProduct.objects.get(space=spaces[2]).price == 1100
+
+@pytest.mark.django_db
+def test_nested_product_edit_shows_up_in_changes(monkeypatch):
+    monkeypatch.setattr('apps.spaces.sync.SETTLE_LAG', timedelta(0))
+    client = APIClient()
+    host = User.objects.create_user(username='host', password='pw', is_host=True)
+    space = Space.objects.create(host=host, title='S', address='A', lat=0, lng=0)
+    product = SpaceProduct.objects.create(space=space, type='HOURLY', price=1000)
+    client.force_authenticate(user=host)
+
+    response = client.get('/api/spaces/spaces/changes/')
+    assert [s['id'] for s in response.data['changed']] == [space.id]
+    cursor = response.data['next_cursor']
+    assert client.get('/api/spaces/spaces/changes/', {'cursor': cursor}).data['changed'] == []
+
+    response = client.patch(f'/api/spaces/spaces/{space.id}/products/{product.id}/', {'price': 1500}, format='json')
+    assert response.status_code == 200
+    response = client.get('/api/spaces/spaces/changes/', {'cursor': cursor})
+    assert [s['id'] for s in response.data['changed']] == [space.id]
@@ -0,0 +1,16 @@
+import hashlib
+from django.core.files.base import ContentFile
+from apps.spaces.storage import ContentAddressedStorage
+
+
+def test_identical_uploads_share_one_file(tmp_path):
+    storage = ContentAddressedStorage(location=str(tmp_path), base_url='/media/')
+    digest = hashlib.sha256(b'photo').hexdigest()
+
+    first = storage.save('spaces/IMG_0001.JPG', ContentFile(b'photo'))
+    second = storage.save('spaces/other name.jpg', ContentFile(b'photo'))
+    assert first == second == f'spaces/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+    assert storage.open(first).read() == b'photo'
+    assert len(list((tmp_path / 'spaces' / digest[:2] / digest[2:4]).iterdir())) == 1
+
+    assert storage.save('spaces/a.jpg', ContentFile(b'other photo')) != first
@@ -0,0 +1,49 @@
+import threading
+import time
+from apps.spaces.suggest import PrefixIndex, SuggestionIndex
+
+def test_prefix_index_matches_word_prefixes():
+    index = PrefixIndex()
+    index.upsert(1, '역삼 센터 주차장', '서울 강남구 역삼동 123')
+    index.upsert(2, '강남역 공영주차장', '서울 강남구 강남대로 396')
+
+    texts = [s['text'] for s in index.suggest('강남')]
+    assert '강남역 공영주차장' in texts
+    assert '서울 강남구 역삼동 123' in texts
+    assert '서울 강남구 강남대로 396' in texts
+
+    assert index.suggest('역삼')[0]['space_id'] == 1
+    assert index.suggest('없는주소') == []
+
+def test_prefix_index_upsert_and_remove():
+    index = PrefixIndex()
+    index.upsert(1, 'Old Title', 'Seoul')
+    index.upsert(1, 'New Title', 'Seoul')
+    assert [s['text'] for s in index.suggest('old')] == []
+    assert [s['text'] for s in index.suggest('new')] == ['New Title']
+    assert len(index) == 1
+
+    index.remove(1)
+    assert index.suggest('seoul') == []
+    assert len(index) == 0
+
+def test_cold_index_is_built_once_for_concurrent_requests(monkeypatch):
+    suggestions = SuggestionIndex()
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        index = PrefixIndex()
+        index.upsert(1, '강남역 공영주차장', '서울 강남구')
+        suggestions._index, suggestions._synced_at = index, time.monotonic()
+
+    monkeypatch.setattr(suggestions, '_build', build)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(suggestions.suggest('강남'))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert all(result[0]['space_id'] == 1 for result in results)
@@ -0,0 +1,37 @@
+import json
+import os
+from types import SimpleNamespace
+from apps.spaces.tiles import tile_of, tile_path, _write_tile, TILE_ZOOM
+
+
+def card(space_id, lat=37.5665, lng=126.9780):
+    return SimpleNamespace(
+        space_id=space_id, lat=lat, lng=lng, title='Lot', address='Seoul', is_auto_approval=True,
+        cover_image=None, cover_thumbnail=None, hourly_price=3000, day_pass_price=None,
+    )
+
+
+def test_tile_of_matches_slippy_tiles():
+    # Seoul city hall at zoom 12
+    assert TILE_ZOOM == 12
+    assert tile_of(37.5665, 126.9780) == (3492, 1586)
+
+
+def test_write_tile_only_touches_changed_files(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    tile = tile_of(37.5665, 126.9780)
+    path = tile_path(tile)
+
+    assert _write_tile(tile, [card(1)]) is True
+    with open(path) as f:
+        features = json.load(f)['features']
+    assert [feature['id'] for feature in features] == [1]
+    assert features[0]['geometry']['coordinates'] == [126.978, 37.5665]
+
+    mtime = os.stat(path).st_mtime_ns
+    assert _write_tile(tile, [card(1)]) is False
+    assert os.stat(path).st_mtime_ns == mtime
+
+    assert _write_tile(tile, []) is True
+    assert not os.path.exists(path)
+    assert _write_tile(tile, []) is False
@@ -0,0 +1,39 @@
+import io
+import os
+import pytest
+from django.test import RequestFactory
+from apps.spaces.uploads import LocalObjectStore, copy_stream, CHUNK_SIZE
+from apps.spaces.views import local_upload_put
+
+
+def test_local_presigned_put(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.SPACE_UPLOAD_STORE = 'local'
+    store = LocalObjectStore()
+    upload = store.presign_put('pending/1/abc.jpg', 'image/jpeg', 10, 60)
+    assert upload['method'] == 'PUT'
+
+    factory = RequestFactory()
+    token = upload['url'].split('/')[-2]
+    response = local_upload_put(factory.put(upload['url'], b'0123456789', content_type='image/jpeg'), token)
+    assert response.status_code == 200
+    assert store.size('pending/1/abc.jpg') == 10
+
+    response = local_upload_put(factory.put(upload['url'], b'x' * 11, content_type='image/jpeg'), token)
+    assert response.status_code == 413
+    response = local_upload_put(factory.put(upload['url'], b'x', content_type='image/png'), token)
+    assert response.status_code == 400
+    response = local_upload_put(factory.put(upload['url'], b'x', content_type='image/jpeg'), token + 'x')
+    assert response.status_code == 403
+
+    store.delete('pending/1/abc.jpg')
+    assert not os.path.exists(store.path('pending/1/abc.jpg'))
+
+
+def test_copy_stream_reads_exact_length():
+    data = b'x' * (CHUNK_SIZE * 2 + 5)
+    out = io.BytesIO()
+    copy_stream(io.BytesIO(data + b'extra'), out, len(data))
+    assert out.getvalue() == data
+    with pytest.raises(ValueError):
+        copy_stream(io.BytesIO(b'short'), io.BytesIO(), 10)